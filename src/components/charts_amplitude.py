@@ -7,7 +7,7 @@ import numpy as np
 def gerar_grafico_historico_amplitude(series_dados, titulo, valor_atual, media_hist):
     df_plot = series_dados.to_frame(name='valor').dropna()
     if df_plot.empty: return go.Figure().update_layout(title_text=titulo)
-    fig = px.line(df_plot, x=df_plot.index, y='valor', title=titulo, template='brokeberg')
+    fig = px.line(df_plot, x=df_plot.index, y='valor', title=titulo, template='brokeberg', render_mode='webgl')
     fig.add_hline(y=media_hist, line_dash="dash", line_color="gray", annotation_text="Média Hist.")
     fig.add_hline(y=valor_atual, line_dash="dot", line_color="yellow", annotation_text=f"Atual: {valor_atual:.2f}")
     
@@ -36,7 +36,16 @@ def gerar_grafico_historico_amplitude(series_dados, titulo, valor_atual, media_h
     return fig
 
 def gerar_histograma_amplitude(series_dados, titulo, valor_atual, media_hist, nbins=50):
-    fig = px.histogram(series_dados, title=titulo, nbins=nbins, template='brokeberg')
+    # Contagens pré-calculadas no servidor: o navegador recebe nbins barras em
+    # vez de todos os pontos da série para binar no cliente
+    valores = pd.Series(series_dados).dropna().to_numpy(dtype=np.float64)
+    contagens, bordas = np.histogram(valores, bins=nbins)
+    fig = go.Figure(go.Bar(
+        x=(bordas[:-1] + bordas[1:]) / 2, y=contagens, width=np.diff(bordas),
+        customdata=np.column_stack([bordas[:-1], bordas[1:]]),
+        hovertemplate='%{customdata[0]:.2f} a %{customdata[1]:.2f}<br>Contagem: %{y}<extra></extra>'
+    ))
+    fig.update_layout(title_text=titulo, template='brokeberg', bargap=0, yaxis_title="Contagem")
     fig.add_vline(x=media_hist, line_dash="dash", line_color="gray", annotation_text=f"Média: {media_hist:.2f}")
     fig.add_vline(x=valor_atual, line_dash="dot", line_color="yellow", annotation_text=f"Atual: {valor_atual:.2f}")
     fig.update_layout(showlegend=False, title_x=0)
@@ -377,12 +386,12 @@ def gerar_grafico_iv_bandas(series_iv, titulo="VXEWZ com Bandas de Bollinger", p
     fig = go.Figure()
     
     # Área entre as bandas
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['Upper'], name='Banda Superior',
         line=dict(color='rgba(128, 128, 128, 0.3)', width=1),
         showlegend=False
     ))
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['Lower'], name='Banda Inferior',
         line=dict(color='rgba(128, 128, 128, 0.3)', width=1),
         fill='tonexty', fillcolor='rgba(100, 100, 100, 0.15)',
@@ -390,13 +399,13 @@ def gerar_grafico_iv_bandas(series_iv, titulo="VXEWZ com Bandas de Bollinger", p
     ))
     
     # Média móvel
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['MM'], name=f'MM{periodo_bb}',
         line=dict(color='#FFA726', width=1.5, dash='dash')
     ))
     
     # IV principal
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['IV'], name='VXEWZ',
         line=dict(color='#29B6F6', width=2)
     ))
@@ -446,12 +455,12 @@ def gerar_grafico_regime_volatilidade(series_iv, titulo="Regime de Volatilidade"
     pos = spread.where(spread >= 0, 0)
     neg = spread.where(spread < 0, 0)
     
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=spread.index, y=pos, name='Backwardation (Stress)',
         line=dict(color='#EF5350', width=1),
         fill='tozeroy', fillcolor='rgba(239, 83, 80, 0.4)'
     ))
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=spread.index, y=neg, name='Contango (Normal)',
         line=dict(color='#66BB6A', width=1),
         fill='tozeroy', fillcolor='rgba(102, 187, 106, 0.4)'
@@ -498,11 +507,11 @@ def gerar_grafico_roc_volatilidade(series_iv, titulo="Taxa de Variação da Vola
     
     fig = go.Figure()
     
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['ROC_5'], name='ROC 5d',
         line=dict(color='#29B6F6', width=1.5)
     ))
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['ROC_21'], name='ROC 21d',
         line=dict(color='#FFA726', width=1.5)
     ))
@@ -549,7 +558,7 @@ def gerar_grafico_iv_rank(series_iv_rank, titulo="IV Rank (252 dias)"):
     fig = go.Figure()
     
     # Área de IV Rank
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df.index, y=df['IV_Rank'], name='IV Rank',
         line=dict(color='#AB47BC', width=2),
         fill='tozeroy', fillcolor='rgba(171, 71, 188, 0.2)'
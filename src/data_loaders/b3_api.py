@@ -1,5 +1,7 @@
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import zipfile
 import io
@@ -8,6 +10,13 @@ from datetime import date, timedelta
 import json
 import base64
 
+# Sessão HTTP compartilhada: reaproveita conexões TCP/TLS entre chamadas e threads
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=25, pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
 @st.cache_data(ttl=300)  # Cache de 5 minutos
 def fetch_option_price_b3(option_ticker, trade_date=None):
     """
@@ -34,7 +43,7 @@ def fetch_option_price_b3(option_ticker, trade_date=None):
     url = f"https://arquivos.b3.com.br/rapinegocios/tickercsv/{option_ticker}/{trade_date}"
     
     try:
-        response = requests.get(url, timeout=15)
+        response = SESSION.get(url, timeout=15)
         if response.status_code != 200:
             return None
         
@@ -15,6 +15,7 @@ import pandas as pd
 import time
 from datetime import datetime, timedelta
 import re
+import threading
 
 # Cache para dados do opcoes.net (evita abrir browser múltiplas vezes)
 _opcoes_cache = {
@@ -23,6 +24,15 @@ _opcoes_cache = {
 }
 CACHE_EXPIRY_MINUTES = 5
 
+# Cache curto do preço spot (yfinance) usado em Term Structure / Skew
+_spot_cache = {}  # ticker -> (datetime, preço)
+SPOT_CACHE_SECONDS = 60
+
+# Limite de browsers abertos ao mesmo tempo (memória + rate limit do opcoes.net),
+# independente de quantas threads chamam get_cached_options_data
+MAX_CONCURRENT_BROWSERS = 3
+_browser_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_BROWSERS)
+
 def get_chrome_driver() -> webdriver.Chrome:
     """Create and configure Chrome WebDriver.
     
@@ -383,7 +393,8 @@ def get_cached_options_data(ticker: str, force_refresh: bool = False) -> pd.Data
     # Buscar novos dados
     print(f"[CACHE] Fetching fresh data for {ticker_upper}...")
     try:
-        raw_data = fetch_opcoes_net_data(ticker_upper)
+        with _browser_semaphore:
+            raw_data = fetch_opcoes_net_data(ticker_upper)
         if not raw_data:
             print(f"[CACHE] No raw data returned for {ticker_upper}")
             return pd.DataFrame()
@@ -410,6 +421,41 @@ def get_cached_options_data(ticker: str, force_refresh: bool = False) -> pd.Data
 # FUNÇÕES PARA TERM STRUCTURE E SKEW (VOLATILITY SURFACE)
 # ============================================================
 
+def get_spot_price(ticker: str, log_tag: str = "SPOT"):
+    """
+    Fechamento anterior do ativo via yfinance `fast_info` (uma única consulta
+    de cotação, sem o quoteSummary completo de `.info`). Fallback: último
+    fechamento de `history(period='5d')`. Cache de SPOT_CACHE_SECONDS por ticker.
+    
+    Returns:
+        Preço (float) ou None se indisponível
+    """
+    ticker_clean = ticker.upper().replace('.SA', '')
+    now = datetime.now()
+    
+    cached = _spot_cache.get(ticker_clean)
+    if cached and (now - cached[0]) < timedelta(seconds=SPOT_CACHE_SECONDS):
+        return cached[1]
+    
+    spot_price = None
+    try:
+        import yfinance as yf
+        stock = yf.Ticker(f"{ticker_clean}.SA")
+        try:
+            spot_price = float(stock.fast_info['previousClose'])
+        except Exception:
+            hist = stock.history(period='5d', actions=False)
+            if not hist.empty:
+                spot_price = float(hist['Close'].iloc[-1])
+        if spot_price is not None and spot_price > 0:
+            _spot_cache[ticker_clean] = (now, spot_price)
+            print(f"[{log_tag}] Spot price for {ticker}: R$ {spot_price:.2f}")
+    except Exception as e:
+        print(f"[{log_tag}] Error getting spot price: {e}")
+    
+    return spot_price
+
+
 def get_term_structure_from_opcoes_net(ticker: str, spot_price: float = None) -> pd.DataFrame:
     """
     Extrai a estrutura a termo da IV usando dados do opcoes.net.
@@ -429,23 +475,8 @@ def get_term_structure_from_opcoes_net(ticker: str, spot_price: float = None) ->
     
     # Determinar spot price se não fornecido
     if spot_price is None or spot_price <= 0:
-        # Buscar preço real via yfinance
-        try:
-            import yfinance as yf
-            ticker_clean = ticker.upper().replace('.SA', '')
-            stock = yf.Ticker(f"{ticker_clean}.SA")
-            info = stock.info
-            if 'previousClose' in info and info['previousClose']:
-                spot_price = float(info['previousClose'])
-            else:
-                hist = stock.history(period='5d')
-                if not hist.empty:
-                    spot_price = float(hist['Close'].iloc[-1])
-            print(f"[TERM] Spot price for {ticker}: R$ {spot_price:.2f}")
-        except Exception as e:
-            print(f"[TERM] Error getting spot price: {e}")
-            # Fallback: usar strike mediano
-            spot_price = df['strike'].median()
+        # Buscar preço real via yfinance (fast_info, com cache curto)
+        spot_price = get_spot_price(ticker, log_tag="TERM")
     
     if spot_price is None or spot_price <= 0:
         spot_price = df['strike'].median()
@@ -529,22 +560,8 @@ def get_volatility_skew_from_opcoes_net(
     
     # Determinar spot price se não fornecido
     if spot_price is None or spot_price <= 0:
-        # Buscar preço real via yfinance
-        try:
-            import yfinance as yf
-            ticker_clean = ticker.upper().replace('.SA', '')
-            stock = yf.Ticker(f"{ticker_clean}.SA")
-            info = stock.info
-            if 'previousClose' in info and info['previousClose']:
-                spot_price = float(info['previousClose'])
-            else:
-                hist = stock.history(period='5d')
-                if not hist.empty:
-                    spot_price = float(hist['Close'].iloc[-1])
-            print(f"[SKEW] Spot price for {ticker}: R$ {spot_price:.2f}")
-        except Exception as e:
-            print(f"[SKEW] Error getting spot price: {e}")
-            spot_price = df['strike'].median()
+        # Buscar preço real via yfinance (fast_info, com cache curto)
+        spot_price = get_spot_price(ticker, log_tag="SKEW")
     
     if spot_price is None or spot_price <= 0:
         spot_price = df['strike'].median()
@@ -9,6 +9,8 @@ import numpy as np
 from datetime import date, datetime
 from typing import Optional, Dict, Tuple
 import os
+from functools import lru_cache
+from pathlib import Path
 
 # Supabase imports (condicionais para permitir uso standalone)
 try:
@@ -18,6 +20,25 @@ try:
 except ImportError:
     STREAMLIT_AVAILABLE = False
 
+# Cache local do histórico de PCR (um parquet por ticker)
+CACHE_DIR = Path(__file__).parent / '.cache'
+
+# Tipo de opção como categórico: códigos int8 0 = CALL, 1 = PUT (-1 = outro)
+TIPO_DTYPE = pd.CategoricalDtype(['CALL', 'PUT'])
+
+
+def codigos_tipo(options_df: pd.DataFrame) -> np.ndarray:
+    """
+    Retorna os códigos do tipo de opção (0 = CALL, 1 = PUT, -1 = outro).
+    
+    Se a coluna 'type' já vier como TIPO_DTYPE (ver _load_options), só lê os
+    códigos; caso contrário normaliza o texto e converte.
+    """
+    tipo = options_df['type']
+    if tipo.dtype != TIPO_DTYPE:
+        tipo = tipo.astype(str).str.upper().astype(TIPO_DTYPE)
+    return tipo.cat.codes.to_numpy()
+
 
 def calcular_pcr(options_df: pd.DataFrame) -> Dict:
     """
@@ -40,17 +61,20 @@ def calcular_pcr(options_df: pd.DataFrame) -> Dict:
             'interpretacao': 'Sem dados'
         }
     
-    # Separar calls e puts
-    calls = options_df[options_df['type'].str.upper() == 'CALL']
-    puts = options_df[options_df['type'].str.upper() == 'PUT']
+    # Totais por tipo: um np.bincount por métrica sobre os códigos (0 = CALL, 1 = PUT)
+    codes = codigos_tipo(options_df)
+    known = codes >= 0
     
-    # Calcular totais de Open Interest
-    total_call_oi = calls['open_interest'].sum() if 'open_interest' in calls.columns else 0
-    total_put_oi = puts['open_interest'].sum() if 'open_interest' in puts.columns else 0
+    def totais(col):
+        if col not in options_df.columns:
+            return 0, 0
+        values = np.nan_to_num(pd.to_numeric(options_df[col], errors='coerce').to_numpy(dtype=np.float64))
+        call_sum, put_sum = np.bincount(codes[known], weights=values[known], minlength=2)
+        return float(call_sum), float(put_sum)
     
-    # Calcular totais de Volume (se disponível)
-    total_call_volume = calls['volume'].sum() if 'volume' in calls.columns else 0
-    total_put_volume = puts['volume'].sum() if 'volume' in puts.columns else 0
+    # Calcular totais de Open Interest e de Volume (se disponível)
+    total_call_oi, total_put_oi = totais('open_interest')
+    total_call_volume, total_put_volume = totais('volume')
     
     # Calcular PCR
     pcr_oi = total_put_oi / total_call_oi if total_call_oi > 0 else None
@@ -97,6 +121,31 @@ def interpretar_pcr(pcr_valor: Optional[float]) -> str:
         return "🔴 Euforia Extrema (possível topo)"
 
 
+def _dor_itm(precos: np.ndarray, strikes: np.ndarray, oi: np.ndarray, call: bool) -> np.ndarray:
+    """
+    Valor intrínseco total (Σ payoff × OI) de uma perna para cada preço de vencimento.
+    
+    Com strikes ordenados e somas acumuladas de OI e strike × OI, cada preço é
+    resolvido por uma busca binária:
+        CALL: Σ_{k < P} (P - k)·oi = P·ΣOI_abaixo - Σ(k·oi)_abaixo
+        PUT:  Σ_{k > P} (k - P)·oi = Σ(k·oi)_acima - P·ΣOI_acima
+    """
+    valid = ~np.isnan(strikes)
+    order = np.argsort(strikes[valid])
+    k = strikes[valid][order]
+    w = oi[valid][order]
+    
+    cum_w = np.concatenate(([0.0], np.cumsum(w)))
+    cum_kw = np.concatenate(([0.0], np.cumsum(k * w)))
+    
+    if call:
+        i = np.searchsorted(k, precos, side='left')
+        return precos * cum_w[i] - cum_kw[i]
+    
+    i = np.searchsorted(k, precos, side='right')
+    return (cum_kw[-1] - cum_kw[i]) - precos * (cum_w[-1] - cum_w[i])
+
+
 def calcular_max_pain(options_df: pd.DataFrame, spot_price: float = None) -> Tuple[Optional[float], Dict[float, float]]:
     """
     Calcula o Max Pain - strike onde compradores de opções perdem mais dinheiro.
@@ -118,58 +167,37 @@ def calcular_max_pain(options_df: pd.DataFrame, spot_price: float = None) -> Tup
     if not all(col in options_df.columns for col in required_cols):
         return None, {}
     
-    # Separar calls e puts
-    calls = options_df[options_df['type'].str.upper() == 'CALL'].copy()
-    puts = options_df[options_df['type'].str.upper() == 'PUT'].copy()
+    # Separar calls e puts em arrays (strike, OI)
+    codes = codigos_tipo(options_df)
+    strikes = options_df['strike'].to_numpy(dtype=np.float64)
+    oi = np.nan_to_num(options_df['open_interest'].to_numpy(dtype=np.float64))
     
-    if calls.empty and puts.empty:
+    is_call = codes == 0
+    is_put = codes == 1
+    
+    if not (is_call.any() or is_put.any()):
         return None, {}
     
-    # Obter todos os strikes únicos
-    all_strikes = sorted(options_df['strike'].unique())
+    # Candidatos = todos os strikes únicos (ordenados)
+    candidates = np.unique(strikes[~np.isnan(strikes)])
     
-    if not all_strikes:
+    if candidates.size == 0:
         return None, {}
     
-    pain_por_strike = {}
-    
-    for price_at_expiry in all_strikes:
-        dor_total = 0
-        
-        # Dor das CALLs (perdem dinheiro quando preço < strike)
-        for _, call in calls.iterrows():
-            if price_at_expiry > call['strike']:
-                # Call ITM - comprador ganha (preço - strike) * OI * 100
-                # Invertemos porque queremos a "dor" do comprador se preço NÃO chegar lá
-                pass  # Não conta como dor neste strike
-            else:
-                # Call OTM - comprador perde tudo (dor = valor intrínseco que TERIA se fosse ITM)
-                # Para max pain, calculamos quanto os compradores perdem
-                pass
-        
-        # Cálculo simplificado: para cada strike de teste, 
-        # somamos quanto os compradores de opções perderiam
-        
-        # CALLs: comprador perde se preço < strike da call
-        for _, call in calls.iterrows():
-            if price_at_expiry > call['strike']:
-                # Call ITM - comprador ganha, vendedor (dealer) perde
-                dor_total += (price_at_expiry - call['strike']) * call['open_interest'] * 100
-        
-        # PUTs: comprador perde se preço > strike da put  
-        for _, put in puts.iterrows():
-            if price_at_expiry < put['strike']:
-                # Put ITM - comprador ganha, vendedor (dealer) perde
-                dor_total += (put['strike'] - price_at_expiry) * put['open_interest'] * 100
-        
-        pain_por_strike[price_at_expiry] = dor_total
+    # Dor total por preço de vencimento. A dor é linear por partes no preço,
+    # com quebras só nos strikes, então o mínimo está sempre em um strike: os
+    # candidatos ficam nos strikes e cada perna sai de somas acumuladas
+    # (O((N + M) log N) em vez da matriz candidatos × contratos).
+    # CALLs ITM quando preço > strike, PUTs ITM quando preço < strike
+    call_pain = _dor_itm(candidates, strikes[is_call], oi[is_call], call=True)
+    put_pain = _dor_itm(candidates, strikes[is_put], oi[is_put], call=False)
+    pain = np.maximum(call_pain + put_pain, 0.0) * 100  # descarta resíduo de arredondamento
     
     # Max Pain = strike com MENOR dor total (onde dealers perdem menos)
-    if pain_por_strike:
-        max_pain_strike = min(pain_por_strike, key=pain_por_strike.get)
-        return max_pain_strike, pain_por_strike
+    max_pain_strike = float(candidates[pain.argmin()])
+    pain_por_strike = dict(zip(candidates.tolist(), pain.tolist()))
     
-    return None, {}
+    return max_pain_strike, pain_por_strike
 
 
 def get_supabase_client_standalone():
@@ -187,9 +215,13 @@ def get_supabase_client_standalone():
     return create_client(url, key)
 
 
+@lru_cache(maxsize=1)
 def get_supabase_client():
     """
     Retorna cliente Supabase (tenta Streamlit primeiro, depois env vars).
+    
+    Cacheado no processo: leituras e gravações reaproveitam o mesmo cliente
+    (e sua conexão HTTP) em vez de criar um novo a cada chamada.
     """
     if STREAMLIT_AVAILABLE:
         try:
@@ -248,7 +280,10 @@ def salvar_pcr_supabase(
 
 def carregar_pcr_historico(ticker: str, dias: int = 252) -> pd.DataFrame:
     """
-    Carrega histórico de PCR do Supabase.
+    Carrega histórico de PCR do Supabase, com cache local em parquet.
+    
+    Só busca no Supabase as linhas a partir da última data já em cache
+    (inclusive, para capturar upserts do dia mais recente).
     
     Args:
         ticker: Ticker do ativo
@@ -257,48 +292,96 @@ def carregar_pcr_historico(ticker: str, dias: int = 252) -> pd.DataFrame:
     Returns:
         DataFrame com histórico
     """
+    ticker = ticker.upper()
+    cache_file = CACHE_DIR / f'pcr_{ticker}.parquet'
+    
+    df_cache = pd.DataFrame()
+    if cache_file.exists():
+        try:
+            df_cache = pd.read_parquet(cache_file)
+        except Exception as e:
+            print(f"[CACHE] Cache de PCR inválido para {ticker}: {e}")
+    
     try:
         client = get_supabase_client()
         
-        response = client.table('pcr_historico') \
+        query = client.table('pcr_historico') \
             .select('*') \
-            .eq('ticker', ticker.upper()) \
+            .eq('ticker', ticker)
+        
+        if not df_cache.empty:
+            query = query.gte('data', df_cache['data'].max().date().isoformat())
+        
+        response = query \
             .order('data', desc=True) \
             .limit(dias) \
             .execute()
         
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df['data'] = pd.to_datetime(df['data'])
-            df = df.sort_values('data')
-            return df
-        
-        return pd.DataFrame()
+        df_novo = pd.DataFrame(response.data or [])
         
     except Exception as e:
         print(f"Erro ao carregar histórico de PCR: {e}")
-        return pd.DataFrame()
+        df_novo = pd.DataFrame()
+    
+    if df_novo.empty:
+        return df_cache.tail(dias).reset_index(drop=True) if not df_cache.empty else pd.DataFrame()
+    
+    df_novo['data'] = pd.to_datetime(df_novo['data'])
+    df = pd.concat([df_cache, df_novo], ignore_index=True) \
+        .drop_duplicates(subset='data', keep='last') \
+        .sort_values('data') \
+        .tail(dias) \
+        .reset_index(drop=True)
+    
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        df.to_parquet(cache_file, index=False, compression='snappy')
+    except Exception as e:
+        print(f"[CACHE] Não foi possível salvar cache de PCR: {e}")
+    
+    return df
 
 
-def calcular_pcr_percentil(pcr_atual: float, df_historico: pd.DataFrame) -> Optional[float]:
+def ordenar_historico_pcr(df_historico: pd.DataFrame) -> np.ndarray:
+    """
+    Retorna o PCR (OI) histórico ordenado, pronto para busca binária.
+    
+    Args:
+        df_historico: DataFrame com histórico de PCR
+        
+    Returns:
+        Array float64 ordenado (vazio se não houver histórico)
+    """
+    if df_historico.empty or 'pcr_oi' not in df_historico.columns:
+        return np.empty(0)
+    
+    return np.sort(pd.to_numeric(df_historico['pcr_oi'], errors='coerce').dropna().to_numpy(dtype=np.float64))
+
+
+def calcular_pcr_percentil(pcr_atual: float, df_historico: pd.DataFrame,
+                           historico_ordenado: Optional[np.ndarray] = None) -> Optional[float]:
     """
     Calcula o percentil do PCR atual em relação ao histórico.
     
     Args:
         pcr_atual: Valor atual do PCR
         df_historico: DataFrame com histórico de PCR
+        historico_ordenado: Resultado de ordenar_historico_pcr (opcional, evita reordenar)
         
     Returns:
         Percentil (0-100) ou None se não houver histórico
     """
-    if df_historico.empty or 'pcr_oi' not in df_historico.columns:
+    if pcr_atual is None:
         return None
     
-    historico = df_historico['pcr_oi'].dropna()
+    if historico_ordenado is None:
+        historico_ordenado = ordenar_historico_pcr(df_historico)
     
-    if len(historico) < 5:
+    if len(historico_ordenado) < 5:
         return None
     
-    percentil = (historico < pcr_atual).sum() / len(historico) * 100
+    # Quantidade de dias com PCR estritamente menor que o atual
+    abaixo = np.searchsorted(historico_ordenado, pcr_atual, side='left')
+    percentil = abaixo / len(historico_ordenado) * 100
     
-    return round(percentil, 1)
+    return round(float(percentil), 1)
@@ -4,12 +4,13 @@ Usado como fallback quando a API B3 não encontra o ticker.
 """
 
 import pandas as pd
-import requests
 import streamlit as st
 from datetime import datetime, date
 from io import StringIO
 import re
 
+from src.data_loaders.b3_api import SESSION
+
 
 @st.cache_data(ttl=3600*12)  # Cache de 12 horas
 def buscar_proventos_detalhados(ticker: str) -> pd.DataFrame:
@@ -35,7 +36,7 @@ def buscar_proventos_detalhados(ticker: str) -> pd.DataFrame:
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        response = SESSION.get(url, headers=headers, timeout=15)
         response.raise_for_status()
         response.encoding = 'latin-1'
         
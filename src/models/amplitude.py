@@ -1,7 +1,10 @@
 
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
 
+from src.models.math_utils import njit, prange, NUMBA_AVAILABLE
+
 def calcular_indicadores_amplitude(_precos_fechamento, rsi_periodo=14):
     """Calcula indicadores de amplitude, incluindo Highs/Lows, McClellan e MACD Breadth."""
     
@@ -79,15 +82,68 @@ def calcular_indicadores_amplitude(_precos_fechamento, rsi_periodo=14):
     
     return df_amplitude
 
+@njit(cache=True, parallel=True)
+def _bucket_stats(codigos, retornos, nbins):
+    """
+    Soma, positivos e contagem de cada coluna de retornos por faixa numa
+    única passada (prange sobre as colunas). Código fora de [0, nbins) ou
+    retorno NaN é ignorado, como no groupby.
+    """
+    n, ncols = retornos.shape
+    soma = np.zeros((nbins, ncols))
+    positivos = np.zeros((nbins, ncols))
+    totais = np.zeros((nbins, ncols))
+    for j in prange(ncols):
+        for i in range(n):
+            b = codigos[i]
+            v = retornos[i, j]
+            if b < 0 or b >= nbins or v != v:
+                continue
+            soma[b, j] += v
+            totais[b, j] += 1.0
+            if v > 0:
+                positivos[b, j] += 1.0
+    return soma, positivos, totais
+
+
+def _hist_stats(codigos, retornos, nbins):
+    """
+    Mesmo resultado de _bucket_stats com np.bincount (sem Numba): cada par
+    (faixa, coluna) vira um índice plano e as três somas saem em C.
+    """
+    n, ncols = retornos.shape
+    chaves = codigos[:, None] * ncols + np.arange(ncols)
+    validos = (codigos[:, None] >= 0) & (codigos[:, None] < nbins) & ~np.isnan(retornos)
+    chaves = chaves[validos]
+    valores = retornos[validos]
+    tamanho = nbins * ncols
+    soma = np.bincount(chaves, weights=valores, minlength=tamanho).reshape(nbins, ncols)
+    positivos = np.bincount(chaves, weights=(valores > 0).astype(np.float64), minlength=tamanho).reshape(nbins, ncols)
+    totais = np.bincount(chaves, minlength=tamanho).astype(np.float64).reshape(nbins, ncols)
+    return soma, positivos, totais
+
+
 def analisar_retornos_por_faixa(df_analise, nome_coluna_indicador, passo, min_range, max_range, sufixo=''):
-    bins = list(range(min_range, max_range + passo, passo))
+    bins = np.arange(min_range, max_range + passo, passo, dtype=np.float64)
     labels = [f'{i} a {i+passo}{sufixo}' for i in range(min_range, max_range, passo)]
-    df_analise[f'faixa'] = pd.cut(df_analise[nome_coluna_indicador], bins=bins, labels=labels, right=False, include_lowest=True)
     colunas_retorno = [col for col in df_analise.columns if 'retorno_' in col]
-    # observed=True is default in recent pandas but good to specify if using Categoricals
-    grouped = df_analise.groupby(f'faixa', observed=False)
-    media_resultados = grouped[colunas_retorno].mean()
-    positivos = grouped[colunas_retorno].agg(lambda x: (x > 0).sum())
-    totais = grouped[colunas_retorno].count()
-    acerto_resultados = (positivos / totais * 100).fillna(0)
+    
+    # Mesmas faixas do pd.cut(right=False): [a, b); fora do range (ou NaN) fica sem faixa
+    indicador = df_analise[nome_coluna_indicador].to_numpy(dtype=np.float64)
+    codigos = np.searchsorted(bins, indicador, side='right') - 1
+    # Retornos em float32 seguem sem cópia para float64 (as somas acumulam em float64)
+    retornos = df_analise[colunas_retorno].to_numpy()
+    if retornos.dtype != np.float32:
+        retornos = retornos.astype(np.float64, copy=False)
+    retornos = np.ascontiguousarray(retornos)
+    estatisticas = _bucket_stats if NUMBA_AVAILABLE else _hist_stats
+    soma, positivos, totais = estatisticas(codigos, retornos, len(labels))
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(totais > 0, soma / totais, np.nan)
+        acerto = np.where(totais > 0, positivos / totais * 100, 0.0)
+    
+    faixas = pd.CategoricalIndex(labels, categories=labels, ordered=True, name='faixa')
+    media_resultados = pd.DataFrame(media, index=faixas, columns=colunas_retorno)
+    acerto_resultados = pd.DataFrame(acerto, index=faixas, columns=colunas_retorno)
     return pd.concat([media_resultados, acerto_resultados], axis=1, keys=['Retorno Médio', 'Taxa de Acerto'])
@@ -3,8 +3,19 @@ Black-Scholes Model Implementation
 Unified module for option pricing, Greeks calculation, and implied volatility.
 """
 
+import math
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
+
+from src.models.math_utils import njit, prange, NUMBA_AVAILABLE
+
+_SQRT_2 = math.sqrt(2.0)
+_INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+
+def _norm_pdf(x):
+    """Densidade normal padrão inline (sem o despacho de scipy.stats.norm)."""
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
 
 
 # =============================================================================
@@ -60,7 +71,7 @@ def black_scholes_put(S, K, T, r, sigma):
     
     d1 = calculate_d1(S, K, T, r, sigma)
     d2 = d1 - sigma * np.sqrt(T)
-    put_price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+    put_price = K * np.exp(-r * T) * ndtr(-d2) - S * ndtr(-d1)
     return put_price
 
 
@@ -80,7 +91,7 @@ def bs_call_price(S: float, K: float, T: float, r: float, sigma: float) -> float
     d1 = calculate_d1(S, K, T, r, sigma)
     d2 = d1 - sigma * np.sqrt(T)
     
-    call = S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+    call = S * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
     return call
 
 
@@ -108,7 +119,7 @@ def calculate_gamma(S: float, K: float, T: float, r: float, sigma: float) -> flo
         return 0.0
     
     d1 = calculate_d1(S, K, T, r, sigma)
-    gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
+    gamma = _norm_pdf(d1) / (S * sigma * np.sqrt(T))
     return gamma
 
 
@@ -121,7 +132,7 @@ def calculate_delta_call(S: float, K: float, T: float, r: float, sigma: float) -
         return 0.0
     
     d1 = calculate_d1(S, K, T, r, sigma)
-    return norm.cdf(d1)
+    return ndtr(d1)
 
 
 def calculate_delta_put(S: float, K: float, T: float, r: float, sigma: float) -> float:
@@ -133,7 +144,7 @@ def calculate_delta_put(S: float, K: float, T: float, r: float, sigma: float) ->
         return 0.0
     
     d1 = calculate_d1(S, K, T, r, sigma)
-    return norm.cdf(d1) - 1
+    return ndtr(d1) - 1
 
 
 def calculate_vega(S: float, K: float, T: float, r: float, sigma: float) -> float:
@@ -146,7 +157,7 @@ def calculate_vega(S: float, K: float, T: float, r: float, sigma: float) -> floa
         return 0.0
     
     d1 = calculate_d1(S, K, T, r, sigma)
-    return S * norm.pdf(d1) * np.sqrt(T) / 100
+    return S * _norm_pdf(d1) * np.sqrt(T) / 100
 
 
 def calculate_greeks(S, K, T, r, sigma, option_type='put'):
@@ -162,14 +173,14 @@ def calculate_greeks(S, K, T, r, sigma, option_type='put'):
     vega = calculate_vega(S, K, T, r, sigma)
     
     if option_type == 'put':
-        delta = norm.cdf(d1) - 1 if T > 0 else 0
-        theta_annual = (-(S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T)) 
-                        + r * K * np.exp(-r * T) * norm.cdf(-d2)) if T > 0 else 0
+        delta = ndtr(d1) - 1 if T > 0 else 0
+        theta_annual = (-(S * _norm_pdf(d1) * sigma) / (2 * np.sqrt(T)) 
+                        + r * K * np.exp(-r * T) * ndtr(-d2)) if T > 0 else 0
         theta_daily = theta_annual / 365
     else:  # call
-        delta = norm.cdf(d1) if T > 0 else 0
-        theta_annual = (-(S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T)) 
-                        - r * K * np.exp(-r * T) * norm.cdf(d2)) if T > 0 else 0
+        delta = ndtr(d1) if T > 0 else 0
+        theta_annual = (-(S * _norm_pdf(d1) * sigma) / (2 * np.sqrt(T)) 
+                        - r * K * np.exp(-r * T) * ndtr(d2)) if T > 0 else 0
         theta_daily = theta_annual / 365
         
     prob_exercise = abs(delta) * 100
@@ -188,27 +199,206 @@ def calculate_greeks(S, K, T, r, sigma, option_type='put'):
 # IMPLIED VOLATILITY
 # =============================================================================
 
-def implied_volatility(market_price, S, K, T, r, max_iter=100, tol=1e-5):
+def _inflection_seed(S, K, T, r):
     """
-    Calcula volatilidade implícita usando Newton-Raphson (para PUTs).
+    Chute inicial no ponto de inflexão do preço em sigma (Higham):
+    sigma_c = sqrt(|2/T * (ln(K/S) + rT)|). A partir dele o Newton-Raphson
+    converge de forma monotônica. Limitado a [5%, 300%] para ATM / T curto.
     """
-    sigma = 0.3  # Chute inicial
+    sigma0 = np.sqrt(np.abs((2.0 / T) * (np.log(K / S) + r * T)))
+    return np.clip(sigma0, 0.05, 3.0)
+
+
+def implied_volatility(market_price, S, K, T, r, max_iter=100, tol=1e-6):
+    """
+    Calcula volatilidade implícita usando Householder de 3ª ordem (para PUTs).
+    
+    Mantém um bracket [1%, 300%] estreitado pelo sinal do erro; quando o passo
+    sai dele (ou a vega é ~0) usa bisseção, como o _implied_volatility_kernel.
+    Sem isso o passo a partir do chute de inflexão pode estourar e parar no
+    limite de 1%.
+    """
+    sigma = float(_inflection_seed(S, K, T, r))
+    lo, hi = 0.01, 3.0  # Limita entre 1% e 300%
+    sqrt_T = np.sqrt(T)
+    disc_K = K * np.exp(-r * T)
+    log_SK = np.log(S / K)
     for i in range(max_iter):
-        price = black_scholes_put(S, K, T, r, sigma)
-        d1 = calculate_d1(S, K, T, r, sigma)
-        vega = S * norm.pdf(d1) * np.sqrt(T)
+        vol_sqrt_T = sigma * sqrt_T
+        d1 = (log_SK + (r + 0.5 * sigma * sigma) * T) / vol_sqrt_T
+        d2 = d1 - vol_sqrt_T
+        price = disc_K * ndtr(-d2) - S * ndtr(-d1)
+        vega = S * _norm_pdf(d1) * sqrt_T
         
-        if vega < 1e-10:
-            break
-            
-        diff = market_price - price
+        diff = price - market_price
         if abs(diff) < tol:
             return sigma
-        sigma = sigma + diff / vega
-        sigma = max(0.01, min(sigma, 3.0))  # Limita entre 1% e 300%
+        
+        # O preço é monotônico em sigma: estreita o bracket
+        if diff > 0:
+            hi = sigma
+        else:
+            lo = sigma
+        
+        step = sigma - _householder3_step(diff, vega, d1, d2, sigma) if vega > 1e-10 else -1.0
+        sigma = step if lo < step < hi else 0.5 * (lo + hi)
     return sigma
 
 
+# =============================================================================
+# NUMBA KERNELS
+# =============================================================================
+
+@njit(cache=True)
+def _norm_cdf(x):
+    """N(x) via erf (compatível com Numba, sem SciPy)."""
+    return 0.5 * (1.0 + math.erf(x / _SQRT_2))
+
+
+@njit(cache=True)
+def _bs_price_vega(S, K, T, r, sigma, is_call):
+    """Preço, vega, d1 e d2 de Black-Scholes numa única avaliação (erf/exp/log)."""
+    sqrt_T = math.sqrt(T)
+    vol_sqrt_T = sigma * sqrt_T
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+    disc_K = K * math.exp(-r * T)
+    if is_call:
+        price = S * _norm_cdf(d1) - disc_K * _norm_cdf(d2)
+    else:
+        price = disc_K * _norm_cdf(-d2) - S * _norm_cdf(-d1)
+    vega = S * _INV_SQRT_2PI * math.exp(-0.5 * d1 * d1) * sqrt_T
+    return price, vega, d1, d2
+
+
+@njit(cache=True)
+def _householder3_step(diff, vega, d1, d2, sigma):
+    """
+    Passo de Householder de 3ª ordem para f(sigma) = preço_modelo - preço_mercado.
+    
+    Usa vega, vomma (= vega * d1*d2 / sigma) e ultima
+    (= -vega / sigma^2 * (d1*d2*(1 - d1*d2) + d1^2 + d2^2)), todas divididas
+    pela vega; convergência cúbica contra quadrática do Newton, com domínio
+    de atração maior nas asas OTM onde a vega é achatada.
+    """
+    h = diff / vega
+    d1d2 = d1 * d2
+    vomma_v = d1d2 / sigma
+    ultima_v = -(d1d2 * (1.0 - d1d2) + d1 * d1 + d2 * d2) / (sigma * sigma)
+    return h * (1.0 - 0.5 * h * vomma_v) / (1.0 - h * vomma_v + h * h * ultima_v / 6.0)
+
+
+@njit(cache=True)
+def _implied_volatility_kernel(price, S, K, T, r, is_call, max_iter, tol):
+    """Householder-3 com bracket [1e-6, 5.0] e bisseção para uma única opção."""
+    if T <= 0.0 or K <= 0.0 or S <= 0.0:
+        return np.nan
+    
+    disc_K = K * math.exp(-r * T)
+    if is_call:
+        intrinsic = max(S - disc_K, 0.0)
+        upper = S
+    else:
+        intrinsic = max(disc_K - S, 0.0)
+        upper = disc_K
+    if not (intrinsic < price < upper):
+        return np.nan
+    
+    # Chute no ponto de inflexão (ver _inflection_seed)
+    sigma = math.sqrt(abs((2.0 / T) * (math.log(K / S) + r * T)))
+    sigma = min(max(sigma, 0.05), 3.0)
+    lo, hi = 1e-6, 5.0
+    for _ in range(max_iter):
+        model, vega, d1, d2 = _bs_price_vega(S, K, T, r, sigma, is_call)
+        diff = model - price
+        if abs(diff) < tol:
+            break
+        
+        if diff > 0:
+            hi = sigma
+        else:
+            lo = sigma
+        
+        step = sigma - _householder3_step(diff, vega, d1, d2, sigma) if vega > 1e-10 else -1.0
+        sigma = step if lo < step < hi else 0.5 * (lo + hi)
+    return sigma
+
+
+@njit(cache=True, parallel=True)
+def _implied_volatility_batch(prices, S, K, T, is_call, r, max_iter, tol):
+    """Aplica o kernel escalar em paralelo (prange) sobre arrays 1-D."""
+    out = np.empty(prices.shape[0])
+    for i in prange(prices.shape[0]):
+        out[i] = _implied_volatility_kernel(prices[i], S[i], K[i], T[i], r, is_call[i], max_iter, tol)
+    return out
+
+
+def implied_volatility_vec(prices, S, K, T, r, is_call=False, max_iter=50, tol=1e-6):
+    """
+    Volatilidade implícita vetorizada: resolve a cadeia inteira de uma vez.
+    
+    Householder-3 com bracket [1e-6, 5.0]: cada iteração avalia preço, vega,
+    vomma e ultima de todos os strikes juntos; quando o passo sai do bracket
+    (ou a vega é ~0) usa bisseção naquele elemento.
+    
+    Args:
+        prices: Prêmios de mercado (array)
+        S: Preço do ativo (escalar ou array)
+        K: Strikes (escalar ou array)
+        T: Tempo até vencimento em anos (escalar ou array)
+        r: Taxa livre de risco anual (decimal)
+        is_call: True para CALLs, False para PUTs (escalar ou array booleano,
+            permitindo resolver CALLs e PUTs da mesma cadeia numa só chamada)
+    
+    Returns:
+        ndarray de volatilidades (decimal); NaN onde o prêmio viola os limites
+        de não-arbitragem (abaixo do intrínseco ou acima do máximo teórico)
+    """
+    S, K, T, prices, is_call = np.broadcast_arrays(
+        np.asarray(S, dtype=np.float64), np.asarray(K, dtype=np.float64),
+        np.asarray(T, dtype=np.float64), np.asarray(prices, dtype=np.float64),
+        np.asarray(is_call, dtype=np.bool_)
+    )
+    
+    if NUMBA_AVAILABLE:
+        flat = [np.ascontiguousarray(a).ravel() for a in (prices, S, K, T, is_call)]
+        out = _implied_volatility_batch(*flat, float(r), max_iter, tol)
+        return out.reshape(prices.shape)
+    
+    with np.errstate(all='ignore'):
+        sqrt_T = np.sqrt(T)
+        disc_K = K * np.exp(-r * T)
+        intrinsic = np.where(is_call, np.maximum(S - disc_K, 0.0), np.maximum(disc_K - S, 0.0))
+        upper = np.where(is_call, S, disc_K)
+        valid = (prices > intrinsic) & (prices < upper) & (T > 0) & (K > 0) & (S > 0)
+        
+        lo = np.full(prices.shape, 1e-6)
+        hi = np.full(prices.shape, 5.0)
+        sigma = _inflection_seed(S, K, T, r)
+        
+        for _ in range(max_iter):
+            d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
+            d2 = d1 - sigma * sqrt_T
+            price = np.where(is_call,
+                             S * ndtr(d1) - disc_K * ndtr(d2),
+                             disc_K * ndtr(-d2) - S * ndtr(-d1))
+            diff = price - prices
+            
+            if np.all(np.abs(diff[valid]) < tol):
+                break
+            
+            # O preço é monotônico em sigma: estreita o bracket
+            hi = np.where(diff > 0, sigma, hi)
+            lo = np.where(diff <= 0, sigma, lo)
+            
+            vega = S * _norm_pdf(d1) * sqrt_T
+            step = sigma - _householder3_step(diff, vega, d1, d2, sigma)
+            use_step = (vega > 1e-10) & (step > lo) & (step < hi)
+            sigma = np.where(use_step, step, 0.5 * (lo + hi))
+    
+    return np.where(valid, sigma, np.nan)
+
+
 def calculate_implied_volatility(
     market_price: float,
     S: float,
@@ -268,7 +458,7 @@ def calculate_implied_volatility(
         
         # Calculate Vega (sensitivity to volatility)
         d1 = calculate_d1(S, K, T, r, sigma)
-        vega = S * norm.pdf(d1) * np.sqrt(T)
+        vega = S * _norm_pdf(d1) * np.sqrt(T)
         
         # Avoid division by very small vega
         if abs(vega) < 1e-10:
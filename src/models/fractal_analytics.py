@@ -14,7 +14,7 @@ from scipy.stats import norm, linregress
 # HURST EXPONENT CALCULATION (R/S ANALYSIS)
 # =============================================================================
 
-def calculate_hurst_exponent(prices: pd.Series) -> float:
+def calculate_hurst_exponent(prices) -> float:
     """
     Calcula o Expoente de Hurst usando Análise R/S (Rescaled Range).
     
@@ -23,54 +23,39 @@ def calculate_hurst_exponent(prices: pd.Series) -> float:
     H > 0.5: Tendência persistente
     
     Args:
-        prices: Series de preços
+        prices: Series ou array de preços
     
     Returns:
         Expoente de Hurst (0 a 1)
     """
     # Calcula retornos logarítmicos
-    log_returns = np.log(prices / prices.shift(1)).dropna().values
+    prices = np.asarray(prices, dtype=np.float64)
+    log_returns = np.diff(np.log(prices))
+    log_returns = log_returns[np.isfinite(log_returns)]
     n = len(log_returns)
     
     if n < 20:
         return 0.5  # Default para random walk se dados insuficientes
     
-    # Calcula R/S para diferentes escalas temporais
+    # Calcula R/S para diferentes escalas temporais: cada escala vira uma
+    # matriz (num_subseries, subseries_len) reduzida por linha
     rs_list = []
     n_list = []
     
-    for div in range(10, n // 2):
-        subseries_len = div
+    for subseries_len in range(10, n // 2):
         num_subseries = n // subseries_len
+        chunks = log_returns[:num_subseries * subseries_len].reshape(num_subseries, subseries_len)
         
-        if num_subseries < 1:
-            continue
-        
-        rs_values = []
+        # Desvio acumulado ajustado pela média
+        cumsum = np.cumsum(chunks - chunks.mean(axis=1, keepdims=True), axis=1)
         
-        for i in range(num_subseries):
-            start_idx = i * subseries_len
-            end_idx = start_idx + subseries_len
-            subseries = log_returns[start_idx:end_idx]
-            
-            if len(subseries) < 2:
-                continue
-            
-            # Desvio acumulado ajustado pela média
-            mean_adj = subseries - np.mean(subseries)
-            cumsum = np.cumsum(mean_adj)
-            
-            # Range (R)
-            R = np.max(cumsum) - np.min(cumsum)
-            
-            # Desvio padrão (S)
-            S = np.std(subseries, ddof=1)
-            
-            if S > 0:
-                rs_values.append(R / S)
+        # Range (R) e desvio padrão (S)
+        R = cumsum.max(axis=1) - cumsum.min(axis=1)
+        S = chunks.std(axis=1, ddof=1)
         
-        if rs_values:
-            rs_list.append(np.mean(rs_values))
+        valid = S > 0
+        if valid.any():
+            rs_list.append(np.mean(R[valid] / S[valid]))
             n_list.append(subseries_len)
     
     if len(rs_list) < 3:
@@ -117,20 +102,24 @@ def calculate_d2_bs(S: float, K: float, T: float, r: float, sigma: float) -> flo
     return d2
 
 
-def prob_exercise_bs(S: float, K: float, T: float, r: float, sigma: float) -> float:
+def prob_exercise_bs(S: float, K, T: float, r: float, sigma):
     """
     Probabilidade de exercício usando Black-Scholes tradicional (N(-d2)).
     Para PUT: P(exercício) = P(S < K) = N(-d2)
+    
+    K e sigma podem ser escalares ou arrays (uma cadeia inteira de strikes).
     """
     d2 = calculate_d2_bs(S, K, T, r, sigma)
     return norm.cdf(-d2)
 
 
-def prob_exercise_fractal(S: float, K: float, T: float, r: float, 
-                          sigma: float, H: float) -> float:
+def prob_exercise_fractal(S: float, K, T: float, r: float, 
+                          sigma, H: float):
     """
     Probabilidade de exercício usando Movimento Browniano Fracionário.
     Diferença chave: usa sigma * T^H ao invés de sigma * sqrt(T)
+    
+    K e sigma podem ser escalares ou arrays (uma cadeia inteira de strikes).
     """
     # Escala de volatilidade fractal
     sigma_fractal = sigma * (T ** H)
@@ -142,10 +131,32 @@ def prob_exercise_fractal(S: float, K: float, T: float, r: float,
     return norm.cdf(-d2)
 
 
-def calculate_historical_volatility(prices: pd.Series) -> float:
-    """Calcula volatilidade histórica anualizada."""
-    log_returns = np.log(prices / prices.shift(1)).dropna()
-    daily_vol = log_returns.std()
+def prob_exercise_combined(S: float, K, T: float, r: float, sigma, H: float) -> tuple:
+    """
+    Probabilidades de exercício BS e fractal em uma única passada.
+    
+    Equivalente a (prob_exercise_bs, prob_exercise_fractal): log(S/K) + rT é
+    calculado uma vez e N(-d2) dos dois modelos sai de uma só chamada a norm.cdf.
+    
+    Returns:
+        tuple (p_bs, p_frac)
+    """
+    sigma = np.asarray(sigma, dtype=np.float64)
+    drift = np.log(S / np.asarray(K, dtype=np.float64)) + r * T
+    
+    # Escalas de volatilidade: sqrt(T) (Browniano) e T^H (fractal)
+    scales = np.stack(np.broadcast_arrays(sigma * np.sqrt(T), sigma * (T ** H)))
+    d2 = (drift - 0.5 * scales**2) / scales
+    
+    p_bs, p_frac = norm.cdf(-d2)
+    return p_bs, p_frac
+
+
+def calculate_historical_volatility(prices) -> float:
+    """Calcula volatilidade histórica anualizada (aceita Series ou array)."""
+    log_returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)))
+    log_returns = log_returns[np.isfinite(log_returns)]
+    daily_vol = np.std(log_returns, ddof=1) if len(log_returns) > 1 else np.nan
     annual_vol = daily_vol * np.sqrt(252)
     return annual_vol
 
@@ -154,12 +165,12 @@ def calculate_historical_volatility(prices: pd.Series) -> float:
 # IV RANK - VOLATILITY CONE
 # =============================================================================
 
-def build_volatility_cone(prices: pd.Series, windows: list = None) -> dict:
+def build_volatility_cone(prices, windows: list = None) -> dict:
     """
     Constrói o Volatility Cone calculando HV para múltiplas janelas.
     
     Args:
-        prices: Série de preços (idealmente 252+ dias)
+        prices: Série ou array de preços (idealmente 252+ dias)
         windows: Lista de janelas em dias [10, 20, 30, 60, 90, 252]
     
     Returns:
@@ -168,6 +179,7 @@ def build_volatility_cone(prices: pd.Series, windows: list = None) -> dict:
     if windows is None:
         windows = [10, 20, 30, 60, 90, 180, 252]
     
+    prices = pd.Series(prices)
     log_returns = np.log(prices / prices.shift(1)).dropna()
     
     cone = {}
@@ -275,6 +287,46 @@ def calculate_iv_rank(current_iv: float, prices: pd.Series, lookback: int = 252)
     }
 
 
+# Limiares de IV Rank e sinais de venda correspondentes (mesmos de calculate_iv_rank)
+IV_RANK_THRESHOLDS = np.array([20, 40, 60, 80])
+IV_RANK_SIGNALS = np.array(["Evitar", "Cautela", "Neutro", "Bom", "Excelente"], dtype=object)
+
+
+def precompute_iv_rank_bounds(prices) -> tuple:
+    """
+    Extremos globais do Volatility Cone, calculados uma vez por ativo.
+    
+    Returns:
+        tuple (hv_min, hv_max), ou None se o histórico não formar um cone
+    """
+    cone = build_volatility_cone(prices)
+    if 'global' not in cone:
+        return None
+    return cone['global']['min'], cone['global']['max']
+
+
+def iv_rank_vec(iv: np.ndarray, bounds: tuple) -> tuple:
+    """
+    IV Rank de uma cadeia inteira de uma vez (mesma escala de calculate_iv_rank).
+    
+    Args:
+        iv: Array de volatilidades implícitas (decimal)
+        bounds: Resultado de precompute_iv_rank_bounds
+    
+    Returns:
+        tuple (iv_rank, sell_signal) como arrays
+    """
+    iv = np.asarray(iv, dtype=np.float64)
+    if bounds is None or bounds[1] == bounds[0]:
+        iv_rank = np.full(iv.shape, 50.0)
+    else:
+        hv_min, hv_max = bounds
+        iv_rank = np.clip((iv - hv_min) / (hv_max - hv_min) * 100, 0, 100)
+    
+    sell_signal = IV_RANK_SIGNALS[np.searchsorted(IV_RANK_THRESHOLDS, iv_rank, side='right')]
+    return np.round(iv_rank, 1), sell_signal
+
+
 def calculate_iv_percentile(current_iv: float, prices: pd.Series, lookback: int = 252) -> float:
     """
     Calcula IV Percentile: % de dias que IV foi MENOR que a atual.
@@ -397,32 +449,35 @@ def run_monte_carlo_fbm(S0: float, K: float, r: float, sigma: float,
 # TREND FILTERS
 # =============================================================================
 
-def check_trend_filters(prices: pd.Series) -> dict:
+def check_trend_filters(prices) -> dict:
     """
     Verifica 3 filtros de tendência para decisão de trading.
     
+    Args:
+        prices: Series ou array de preços (sem NaN)
+    
     Returns:
         dict com resultados dos filtros e valores
     """
-    current_price = prices.iloc[-1]
+    prices = np.asarray(prices, dtype=np.float64)
+    current_price = prices[-1]
     
     # Filtro A: Preço > SMA 21
-    sma_21 = prices.tail(21).mean()
-    filter_a = current_price > sma_21
+    sma_21 = prices[-21:].mean()
+    filter_a = bool(current_price > sma_21)
     
     # Filtro B: Momentum 30 dias > 0
     if len(prices) >= 30:
-        momentum_30 = (current_price / prices.iloc[-30] - 1) * 100
+        momentum_30 = (current_price / prices[-30] - 1) * 100
     else:
-        momentum_30 = (current_price / prices.iloc[0] - 1) * 100
-    filter_b = momentum_30 > 0
+        momentum_30 = (current_price / prices[0] - 1) * 100
+    filter_b = bool(momentum_30 > 0)
     
     # Filtro C: Slope da Regressão Linear 30 dias > 0
-    prices_30 = prices.tail(30)
-    x = np.arange(len(prices_30))
-    y = prices_30.values
+    y = prices[-30:]
+    x = np.arange(len(y))
     slope, intercept, r_value, p_value, std_err = linregress(x, y)
-    filter_c = slope > 0
+    filter_c = bool(slope > 0)
     
     return {
         'filter_a': filter_a,
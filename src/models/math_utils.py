@@ -2,6 +2,108 @@
 import pandas as pd
 import numpy as np
 
+# Numba é opcional: sem ele, os kernels decorados rodam como Python puro
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def rolling_minmax(x, w):
+    """
+    Mínimo e máximo móveis (janela w) numa única passada O(N), com duas filas
+    monotônicas de índices. Equivale a rolling(w).min()/.max() do pandas para
+    séries sem NaN: as primeiras w-1 posições ficam NaN.
+    """
+    n = x.shape[0]
+    out_min = np.full(n, np.nan)
+    out_max = np.full(n, np.nan)
+    q_min = np.empty(n, np.int64)
+    q_max = np.empty(n, np.int64)
+    h_min = t_min = h_max = t_max = 0
+    
+    for i in range(n):
+        v = x[i]
+        while t_min > h_min and x[q_min[t_min - 1]] >= v:
+            t_min -= 1
+        q_min[t_min] = i
+        t_min += 1
+        while t_max > h_max and x[q_max[t_max - 1]] <= v:
+            t_max -= 1
+        q_max[t_max] = i
+        t_max += 1
+        
+        # Descarta o índice que saiu da janela
+        if q_min[h_min] <= i - w:
+            h_min += 1
+        if q_max[h_max] <= i - w:
+            h_max += 1
+        
+        if i >= w - 1:
+            out_min[i] = x[q_min[h_min]]
+            out_max[i] = x[q_max[h_max]]
+    return out_min, out_max
+
+
+@njit(cache=True)
+def media_desvio_percentil(x, alvo):
+    """
+    Média, desvio padrão amostral (ddof=1) e percentil de `alvo` em x numa
+    única passada (Welford em float64; NaN ignorado). O percentil segue
+    scipy.stats.percentileofscore(kind='rank'): empates contam pela metade.
+    """
+    n = 0
+    media = 0.0
+    m2 = 0.0
+    abaixo = 0
+    iguais = 0
+    for i in range(x.shape[0]):
+        v = x[i]
+        if v != v:
+            continue
+        n += 1
+        delta = v - media
+        media += delta / n
+        m2 += delta * (v - media)
+        if v < alvo:
+            abaixo += 1
+        elif v == alvo:
+            iguais += 1
+    if n == 0:
+        return np.nan, np.nan, np.nan
+    desvio = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+    percentil = (2 * abaixo + iguais + (1 if iguais > 0 else 0)) * 50.0 / n
+    return media, desvio, percentil
+
+
+@njit(cache=True)
+def fracao_nas_caudas(x, alto, baixo):
+    """
+    Fração de x com valor >= alto e fração com valor <= baixo, numa única
+    passada e sem arrays booleanos temporários. NaN conta no total (como o
+    .mean() de uma comparação); x vazio devolve NaN.
+    """
+    n = x.shape[0]
+    if n == 0:
+        return np.nan, np.nan
+    acima = 0
+    abaixo = 0
+    for i in range(n):
+        v = x[i]
+        if v >= alto:
+            acima += 1
+        if v <= baixo:
+            abaixo += 1
+    return acima / n, abaixo / n
+
 def parse_pt_br_float(s):
     try:
         if isinstance(s, (int, float)):
@@ -6,15 +6,25 @@ import pandas as pd
 from dateutil.relativedelta import relativedelta
 from datetime import date, timedelta
 import math
+from functools import lru_cache
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_selic_annual():
+    """
+    Fetches the latest annualized Selic Meta from BCB API (Series 432).
+    Raises on failure: st.cache_data does not cache exceptions, so a BCB
+    timeout is retried on the next call instead of pinning a value for a day.
+    """
+    url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.432/dados/ultimos/1?formato=json"
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    return float(data[0]['valor'])
 
 def get_selic_annual():
-    """Fetches the latest annualized Selic Meta from BCB API (Series 432)."""
+    """Latest annualized Selic Meta; the fallback is applied here, outside the cache."""
     try:
-        url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.432/dados/ultimos/1?formato=json"
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        return float(data[0]['valor'])
+        return _fetch_selic_annual()
     except Exception as e:
         return 11.25 # Fallback
 
@@ -83,6 +93,7 @@ def get_asset_price_yesterday(ticker):
     except Exception as e:
         return 0.0
 
+@lru_cache(maxsize=256)
 def get_third_friday(year, month):
     """Calculates the date of the 3rd Friday of a given year and month."""
     d = date(year, month, 1)
@@ -91,6 +102,7 @@ def get_third_friday(year, month):
     third_friday = first_friday + timedelta(days=14)
     return third_friday
 
+@lru_cache(maxsize=8)
 def get_next_expiration(current_date):
     """Finds the next valid monthly expiration (3rd Friday)."""
     next_month_date = current_date + relativedelta(months=1)
@@ -1,6 +1,7 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
 from src.data_loaders.cvm import baixar_e_extrair_zip_cvm
 from src.models.insiders import (
@@ -10,6 +11,14 @@ from src.models.insiders import (
 )
 from src.components.charts_insiders import gerar_grafico_historico_insider
 
+# Colunas efetivamente usadas pelos modelos de insiders (o restante do CSV é descartado na leitura)
+COLS_MOV = ('CNPJ_Companhia', 'Nome_Companhia', 'Data_Movimentacao', 'Tipo_Cargo',
+            'Tipo_Movimentacao', 'Quantidade', 'Preco_Unitario', 'Volume')
+COLS_CAD = ('CNPJ_Companhia', 'Codigo_Negociacao', 'Valor_Mobiliario')
+DTYPE_MOV = {'CNPJ_Companhia': str, 'Nome_Companhia': str, 'Tipo_Cargo': str,
+             'Tipo_Movimentacao': str, 'Data_Movimentacao': str}
+DTYPE_CAD = {'CNPJ_Companhia': str, 'Codigo_Negociacao': str, 'Valor_Mobiliario': str}
+
 def render():
     st.header("Radar de Movimentação de Insiders (CVM)")
     st.info(
@@ -35,10 +44,14 @@ def render():
     CSV_CAD_ANTERIOR = f"fca_cia_aberta_valor_mobiliario_{ANO_ANTERIOR}.csv"
 
     with st.spinner(f"Baixando dados da CVM ({ANO_ANTERIOR} e {ANO_ATUAL})..."):
-        df_mov_atual = baixar_e_extrair_zip_cvm(URL_MOV_ATUAL, CSV_MOV_ATUAL, show_error=False)
-        df_cad_atual = baixar_e_extrair_zip_cvm(URL_CAD_ATUAL, CSV_CAD_ATUAL, show_error=False)
-        df_mov_anterior = baixar_e_extrair_zip_cvm(URL_MOV_ANTERIOR, CSV_MOV_ANTERIOR, show_error=False)
-        df_cad_anterior = baixar_e_extrair_zip_cvm(URL_CAD_ANTERIOR, CSV_CAD_ANTERIOR, show_error=False)
+        df_mov_atual = baixar_e_extrair_zip_cvm(URL_MOV_ATUAL, CSV_MOV_ATUAL, show_error=False,
+                                                 usecols=COLS_MOV, dtype=DTYPE_MOV)
+        df_cad_atual = baixar_e_extrair_zip_cvm(URL_CAD_ATUAL, CSV_CAD_ATUAL, show_error=False,
+                                                 usecols=COLS_CAD, dtype=DTYPE_CAD)
+        df_mov_anterior = baixar_e_extrair_zip_cvm(URL_MOV_ANTERIOR, CSV_MOV_ANTERIOR, show_error=False,
+                                                 usecols=COLS_MOV, dtype=DTYPE_MOV)
+        df_cad_anterior = baixar_e_extrair_zip_cvm(URL_CAD_ANTERIOR, CSV_CAD_ANTERIOR, show_error=False,
+                                                 usecols=COLS_CAD, dtype=DTYPE_CAD)
 
     # Combina movimentações dos dois anos
     dfs_mov = [df for df in [df_mov_anterior, df_mov_atual] if df is not None]
@@ -84,9 +97,11 @@ def render():
                 st.markdown("---")
                 st.subheader("Destaques da Análise")
                 cols_destaques = st.columns(3)
-                maior_compra = df_resultado.loc[df_resultado['Volume Líquido (R$)'].idxmax()]
-                maior_venda = df_resultado.loc[df_resultado['Volume Líquido (R$)'].idxmin()]
-                maior_relevancia = df_resultado.loc[df_resultado['% do Market Cap'].abs().idxmax()]
+                volumes = df_resultado['Volume Líquido (R$)'].to_numpy()
+                pct_mkt_cap = np.abs(df_resultado['% do Market Cap'].to_numpy())
+                maior_compra = df_resultado.iloc[volumes.argmax()]
+                maior_venda = df_resultado.iloc[volumes.argmin()]
+                maior_relevancia = df_resultado.iloc[pct_mkt_cap.argmax()]
 
                 cols_destaques[0].metric(
                     label=f"📈 Maior Compra Líquida: {maior_compra['Ticker']}",
@@ -11,22 +11,26 @@ import numpy as np
 import yfinance as yf
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import NamedTuple
+import logging
 
-from src.models.put_utils import (
-    get_selic_annual, get_third_friday,
-    get_asset_price_yesterday
-)
+from src.models.put_utils import get_selic_annual
 from src.data_loaders.opcoes_net import get_put_options_for_screener
-from src.models.black_scholes import implied_volatility, calculate_greeks
+from src.models.black_scholes import implied_volatility_vec, calculate_greeks
 from src.models.fractal_analytics import (
     calculate_hurst_exponent, get_hurst_interpretation,
-    prob_exercise_bs, prob_exercise_fractal, calculate_historical_volatility,
-    check_trend_filters, get_recommendation, calculate_iv_rank
+    prob_exercise_combined, calculate_historical_volatility,
+    check_trend_filters, get_recommendation,
+    precompute_iv_rank_bounds, iv_rank_vec
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 # Lista de ações mais líquidas
 LIQUID_TICKERS = [
     "VALE3", "PETR4", "MGLU3", "BBAS3", "BRAV3", "ITUB4", "B3SA3", 
@@ -38,224 +42,357 @@ LIQUID_TICKERS = [
 # Range de strikes em % do spot (ITM/OTM)
 STRIKE_RANGE_PCT = 5.0
 
+# Threads do scan: o número de browsers simultâneos é limitado à parte
+# (MAX_CONCURRENT_BROWSERS em opcoes_net), então as demais etapas se sobrepõem
+SCAN_WORKERS = 8
+
+# Casas decimais por coluna, aplicadas uma única vez sobre o DataFrame final
+ROUND_SPEC = {
+    'Spot': 2, 'Strike': 2, 'Prêmio': 2, 'Moneyness': 1, 'Delta': 4, 'Gamma': 4,
+    'IV': 1, 'Yield %': 2, 'Yield A.': 1, '% CDI': 0, 'Hurst': 3,
+    'Prob BS': 1, 'Prob Frac': 1, 'IV Rank': 0,
+}
+
+# Colunas numéricas da cadeia de opções, convertidas para float64 logo após a busca
+NUMERIC_COLS = ['delta', 'gamma', 'iv', 'premium', 'strike', 'open_interest']
+
+
+@lru_cache(maxsize=4)
+def _download_history(tickers: tuple, today: date) -> pd.DataFrame:
+    """
+    Baixa o histórico de todos os tickers em uma única requisição ao Yahoo.
+    Cacheado em memória por dia: scans repetidos na mesma sessão não refazem o download.
+    Download vazio ou parcial (falha de rede/Yahoo) levanta ValueError, que o
+    lru_cache não memoriza: o próximo scan tenta de novo.
+    """
+    start_date = today - timedelta(days=int(252 * 1.5))
+    hist_all = yf.download([f"{t}.SA" for t in tickers], start=start_date.strftime('%Y-%m-%d'),
+                           end=today.strftime('%Y-%m-%d'), group_by='ticker',
+                           auto_adjust=False, progress=False, threads=True)
+    sem_preco = [t for t in tickers if _spot_from_history(_history_slice(hist_all, t)) <= 0]
+    if sem_preco:
+        raise ValueError(f"Histórico do Yahoo incompleto, sem preço para: {', '.join(sem_preco)}")
+    return hist_all
+
+
+def _history_slice(hist_all: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Extrai o histórico de um ticker do download em lote (MultiIndex ticker → campo)."""
+    full_ticker = f"{ticker}.SA"
+    if isinstance(hist_all.columns, pd.MultiIndex):
+        if full_ticker not in hist_all.columns.get_level_values(0):
+            return pd.DataFrame()
+        return hist_all[full_ticker].dropna(how='all')
+    return hist_all.dropna(how='all')
+
+
+def _spot_from_history(hist: pd.DataFrame) -> float:
+    """
+    Fechamento de ontem a partir do histórico em lote (mesma semântica de
+    get_asset_price_yesterday: o download termina em `today`, exclusivo).
+    """
+    if hist.empty or 'Close' not in hist.columns:
+        return 0.0
+    closes = hist['Close'].dropna()
+    return float(closes.iloc[-1]) if len(closes) else 0.0
+
+
+def fetch_ticker_inputs(ticker: str, spot: float, expiry: date):
+    """
+    Etapa de I/O do scan: busca a cadeia de PUTs de um ticker.
+    
+    Returns:
+        tuple (spot, options_df), ou None se não houver dados
+    """
+    try:
+        print(f"[SCREENER] Scanning {ticker}: Spot = R$ {spot:.2f}")
+        
+        # Busca opções PUT do opcoes.net com range de 5% ITM/OTM
+        options_df = get_put_options_for_screener(
+            ticker=ticker,
+            spot_price=spot,
+            expiry_date=expiry,
+            strike_range_pct=STRIKE_RANGE_PCT
+        )
+    except Exception as e:
+        print(f"[SCREENER] {ticker}: Error fetching options: {e}")
+        return None
+    
+    if options_df.empty:
+        print(f"[SCREENER] {ticker}: No PUT options found")
+        return None
+    print(f"[SCREENER] {ticker}: Found {len(options_df)} PUT options")
+    
+    # Normaliza tipos uma única vez: colunas ausentes viram NaN
+    for col in NUMERIC_COLS:
+        options_df[col] = pd.to_numeric(options_df[col], errors='coerce') if col in options_df else np.nan
+    if 'option_ticker' not in options_df:
+        options_df['option_ticker'] = ''
+    return spot, options_df
+
+
+class TickerFractals(NamedTuple):
+    """Métricas que dependem apenas do histórico de preços do ticker."""
+    hurst: float
+    hist_vol: float
+    recent_return: float
+    filters: dict
+    iv_rank_bounds: tuple  # (hv_min, hv_max) do Volatility Cone, ou None
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _ticker_fractals(ticker: str, today: date, _hist: pd.DataFrame):
+    """
+    Calcula Hurst, vol histórica e filtros de tendência de um ticker.
+    
+    Cacheado por (ticker, dia): o histórico (_hist, fora da chave) só muda de um
+    dia para o outro, então novos scans e reruns reaproveitam o resultado.
+    
+    Returns:
+        TickerFractals, ou None se o histórico for insuficiente
+    """
+    if _hist.empty or len(_hist) < 50:
+        return None
+    
+    # Extrai série de preços direto para float64 contíguo
+    if 'Adj Close' in _hist.columns:
+        close_col = _hist['Adj Close']
+    elif 'Close' in _hist.columns:
+        close_col = _hist['Close']
+    else:
+        close_col = _hist.iloc[:, 0]
+    
+    close_arr = np.ascontiguousarray(close_col.dropna().to_numpy()[-252:], dtype=np.float64)
+    
+    hurst = calculate_hurst_exponent(close_arr)
+    hist_vol = calculate_historical_volatility(close_arr)
+    filters = check_trend_filters(close_arr)
+    recent_return = (close_arr[-1] / close_arr[-20] - 1) * 100 if len(close_arr) >= 20 else 0
+    
+    return TickerFractals(float(hurst), float(hist_vol), float(recent_return), filters,
+                          precompute_iv_rank_bounds(close_arr))
+
+
+def _expiry_context(expiry: date, selic_annual: float) -> dict:
+    """Escalares que dependem só do vencimento e da Selic, calculados uma vez por scan."""
+    days_to_exp = (expiry - date.today()).days
+    return {
+        'T': max(days_to_exp / 365.0, 0.001),
+        'r': selic_annual / 100,
+        'selic_period': ((1 + selic_annual/100) ** (days_to_exp/365) - 1) * 100,
+        'ann_exp': 365.0 / max(days_to_exp, 1),  # expoente de anualização do yield
+    }
+
 
-def scan_single_ticker(ticker: str, expiry: date, selic_annual: float) -> list:
+def scan_single_ticker(ticker: str, spot: float, options_df: pd.DataFrame,
+                       fractals: TickerFractals, ctx: dict):
     """
-    Escaneia um ticker individual e retorna lista de opções PUT com métricas.
+    Etapa de CPU do scan: métricas das opções PUT de um ticker.
+    
+    Args:
+        spot: Preço do ativo
+        options_df: Cadeia de PUTs retornada por get_put_options_for_screener
+        fractals: Métricas do histórico do ticker (ver _ticker_fractals)
+        ctx: Escalares do vencimento, comuns a todos os tickers (ver _expiry_context)
     
     Returns:
-        list de dicts com métricas de cada opção, ou lista vazia se erro
+        dict coluna → ndarray (uma posição por opção), ou None se erro
     """
     try:
-        print(f"[SCREENER] Scanning {ticker}...")
+        hurst, hist_vol, recent_return, filters, iv_rank_bounds = fractals
         
-        # 1. Busca preço do ativo
-        spot = get_asset_price_yesterday(ticker)
-        if spot <= 0:
-            print(f"[SCREENER] {ticker}: No spot price found")
-            return []
-        print(f"[SCREENER] {ticker}: Spot = R$ {spot:.2f}")
+        # Interpretação Hurst
+        interpretation, trend_dir, _ = get_hurst_interpretation(hurst, recent_return)
         
-        # 2. Busca opções PUT do opcoes.net com range de 5% ITM/OTM
-        try:
-            options_df = get_put_options_for_screener(
-                ticker=ticker,
-                spot_price=spot,
-                expiry_date=expiry,
-                strike_range_pct=STRIKE_RANGE_PCT
-            )
-        except Exception as e:
-            print(f"[SCREENER] {ticker}: Error fetching options: {e}")
-            return []
+        # Recomendação
+        classification, rec_text, risk_level, rec_color = get_recommendation(hurst, filters, spot)
         
-        if options_df.empty:
-            print(f"[SCREENER] {ticker}: No PUT options found")
-            return []
-        print(f"[SCREENER] {ticker}: Found {len(options_df)} PUT options")
+        # 5. Métricas de todas as opções PUT de uma vez (vetorizado)
+        T, r, selic_period = ctx['T'], ctx['r'], ctx['selic_period']
         
-        # 3. Busca histórico para análise fractal (apenas uma vez por ticker)
-        full_ticker = f"{ticker}.SA"
-        start_date = date.today() - timedelta(days=int(252 * 1.5))
-        hist = yf.download(full_ticker, start=start_date.strftime('%Y-%m-%d'), 
-                          end=date.today().strftime('%Y-%m-%d'), progress=False)
+        premium = options_df['premium'].to_numpy(dtype=np.float64)
+        strike = options_df['strike'].to_numpy(dtype=np.float64)
+        valid = (premium > 0) & (strike > 0)  # NaN (prêmio ausente) também é descartado
+        if not valid.any():
+            return None
         
-        if hist.empty or len(hist) < 50:
-            print(f"[SCREENER] {ticker}: Insufficient historical data")
-            return []
+        opts = options_df[valid]
+        premium = premium[valid]
+        strike = strike[valid]
+        n = len(opts)
         
-        # Extrai série de preços
-        if 'Adj Close' in hist.columns:
-            close_prices = hist['Adj Close'].tail(252)
-        elif 'Close' in hist.columns:
-            close_prices = hist['Close'].tail(252)
-        else:
-            close_prices = hist.iloc[:, 0].tail(252)
+        # Yields
+        yield_period = (premium / spot) * 100
+        yield_annual = (np.power(1 + yield_period/100, ctx['ann_exp']) - 1) * 100
+        pct_cdi = yield_period / selic_period * 100 if selic_period > 0 else np.zeros(n)
         
-        if isinstance(close_prices, pd.DataFrame):
-            close_prices = close_prices.squeeze()
+        # Moneyness
+        moneyness = ((strike - spot) / spot) * 100
         
-        # 4. Calcula métricas fractais (uma vez por ticker)
-        hurst = calculate_hurst_exponent(close_prices)
-        hist_vol = calculate_historical_volatility(close_prices)
-        filters = check_trend_filters(close_prices)
+        # IV - usar do site ou calcular (fallback: vol histórica)
+        # Cópia própria: sob Copy-on-Write o to_numpy devolve view somente leitura
+        iv = opts['iv'].to_numpy(dtype=np.float64, copy=True)
+        missing_iv = ~(iv > 0)
+        if missing_iv.any():
+            iv_calc = implied_volatility_vec(premium[missing_iv], spot, strike[missing_iv], T, r)
+            iv[missing_iv] = np.where(iv_calc > 0, iv_calc, hist_vol)
         
-        # Interpretação Hurst
-        recent_return = (close_prices.iloc[-1] / close_prices.iloc[-20] - 1) * 100 if len(close_prices) >= 20 else 0
-        interpretation, trend_dir, _ = get_hurst_interpretation(hurst, recent_return)
+        # Probabilidades (d1/d2 e N(-d2) em broadcast sobre todos os strikes)
+        prob_bs, prob_frac = prob_exercise_combined(spot, strike, T, r, iv, hurst)
         
-        # Recomendação
-        classification, rec_text, risk_level, rec_color = get_recommendation(hurst, filters, spot)
+        # IV Rank
+        iv_rank, iv_signal = iv_rank_vec(iv, iv_rank_bounds)
         
-        # 5. Processa cada opção PUT encontrada
-        results = []
-        days_to_exp = (expiry - date.today()).days
-        T = max(days_to_exp / 365.0, 0.001)
-        r = selic_annual / 100
-        selic_period = ((1 + selic_annual/100) ** (days_to_exp/365) - 1) * 100
+        # Gregas do site (NaN quando ausentes)
+        delta = opts['delta'].to_numpy(dtype=np.float64)
+        gamma = opts['gamma'].to_numpy(dtype=np.float64)
+        oi = np.nan_to_num(opts['open_interest'].to_numpy(dtype=np.float64)).astype(np.int64)
         
-        for _, opt in options_df.iterrows():
-            premium = opt.get('premium', 0)
-            strike = opt.get('strike', 0)
-            option_ticker = opt.get('option_ticker', '')
-            
-            if premium is None or premium <= 0 or strike <= 0:
-                continue
-            
-            # Yields
-            yield_period = (premium / spot) * 100
-            yield_annual = ((1 + yield_period/100) ** (365/max(days_to_exp, 1)) - 1) * 100
-            pct_cdi = (yield_period / selic_period * 100) if selic_period > 0 else 0
-            
-            # Moneyness
-            moneyness = ((strike - spot) / spot) * 100
-            
-            # IV - usar do site ou calcular
-            iv = opt.get('iv', None)
-            if iv is None or iv <= 0:
-                try:
-                    iv = implied_volatility(premium, spot, strike, T, r)
-                    if iv <= 0:
-                        iv = hist_vol
-                except:
-                    iv = hist_vol
-            
-            # Probabilidades
-            prob_bs = prob_exercise_bs(spot, strike, T, r, iv if iv else hist_vol)
-            prob_frac = prob_exercise_fractal(spot, strike, T, r, iv if iv else hist_vol, hurst)
-            
-            # IV Rank
-            iv_rank_data = calculate_iv_rank(iv if iv else hist_vol, close_prices)
-            iv_rank = iv_rank_data['iv_rank']
-            iv_signal = iv_rank_data.get('sell_signal', 'Neutro')  # Fallback se não tiver
-            
-            # Gregas do site - converter para scalar se for Series
-            delta = opt.get('delta', None)
-            gamma = opt.get('gamma', None)
-            
-            # Converter Series para scalar
-            if isinstance(delta, pd.Series):
-                delta = delta.iloc[0] if len(delta) > 0 else None
-            if isinstance(gamma, pd.Series):
-                gamma = gamma.iloc[0] if len(gamma) > 0 else None
-            
-            results.append({
-                'Ticker': ticker,
-                'Opção': option_ticker,
-                'Spot': round(spot, 2),
-                'Strike': round(strike, 2),
-                'Prêmio': round(premium, 2),
-                'Moneyness': round(moneyness, 1),
-                'Delta': round(float(delta), 4) if delta is not None and not pd.isna(delta) else None,
-                'Gamma': round(float(gamma), 4) if gamma is not None and not pd.isna(gamma) else None,
-                'IV': round(float(iv) * 100, 1) if iv and iv > 0 else None,
-                'Yield %': round(yield_period, 2),
-                'Yield A.': round(yield_annual, 1),
-                '% CDI': round(pct_cdi, 0),
-                'Hurst': round(hurst, 3),
-                'Tipo': interpretation,
-                'Direção': trend_dir,
-                'SMA21': '✅' if filters['filter_a'] else '❌',
-                'Mom 30d': '✅' if filters['filter_b'] else '❌',
-                'Slope': '✅' if filters['filter_c'] else '❌',
-                'Prob BS': round(prob_bs * 100, 1),
-                'Prob Frac': round(prob_frac * 100, 1),
-                'Recomendação': classification,
-                'Risco': risk_level,
-                '_rec_color': rec_color,
-                'OI': int(opt.get('open_interest', 0)),
-                'IV Rank': round(iv_rank, 0),
-                'IV Sinal': iv_signal,
-            })
+        def full(value):
+            return np.full(n, value, dtype=object if isinstance(value, str) else None)
         
-        return results
+        return {
+            'Ticker': full(ticker),
+            'Opção': opts['option_ticker'].to_numpy(dtype=object),
+            'Spot': full(spot),
+            'Strike': strike,
+            'Prêmio': premium,
+            'Moneyness': moneyness,
+            'Delta': delta,
+            'Gamma': gamma,
+            'IV': np.where(iv > 0, iv * 100, np.nan),
+            'Yield %': yield_period,
+            'Yield A.': yield_annual,
+            '% CDI': pct_cdi,
+            'Hurst': full(hurst),
+            'Tipo': full(interpretation),
+            'Direção': full(trend_dir),
+            'SMA21': full('✅' if filters['filter_a'] else '❌'),
+            'Mom 30d': full('✅' if filters['filter_b'] else '❌'),
+            'Slope': full('✅' if filters['filter_c'] else '❌'),
+            'Prob BS': prob_bs * 100,
+            'Prob Frac': prob_frac * 100,
+            'Recomendação': full(classification),
+            'Risco': full(risk_level),
+            '_rec_color': full(rec_color),
+            'OI': oi,
+            'IV Rank': iv_rank,
+            'IV Sinal': iv_signal,
+        }
         
     except Exception as e:
-        print(f"[SCREENER] Error scanning {ticker}: {e}")
-        traceback.print_exc()
-        return []
+        print(f"[SCREENER] Error scanning {ticker}: {type(e).__name__}: {e}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Traceback do scan de %s", ticker, exc_info=True)
+        return None
 
 
-def run_full_scan(tickers: list, expiry: date, progress_callback=None) -> pd.DataFrame:
+def run_full_scan(tickers: list, expiry: date) -> pd.DataFrame:
     """
-    Escaneia todos os tickers em paralelo.
+    Escaneia todos os tickers: I/O em threads, cálculos vetorizados no próprio processo.
     
     Returns:
         DataFrame com resultados
     """
-    selic_annual = get_selic_annual()
-    all_results = []
+    ctx = _expiry_context(expiry, get_selic_annual())
+    payloads = []
     
-    with ThreadPoolExecutor(max_workers=3) as executor:  # Reduzido para evitar rate limit
-        futures = {
-            executor.submit(scan_single_ticker, ticker, expiry, selic_annual): ticker 
-            for ticker in tickers
-        }
+    # Histórico de todos os ativos em uma única requisição
+    hist_all = _download_history(tuple(tickers), date.today())
+    
+    # Spot (fechamento de ontem) sai do mesmo download, sem chamada extra ao Yahoo;
+    # _download_history já garante preço para todos os tickers
+    spots = {ticker: _spot_from_history(_history_slice(hist_all, ticker)) for ticker in tickers}
+    
+    # 1. I/O: cadeias de opções (limitado por rede/browser)
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        results = executor.map(fetch_ticker_inputs, tickers, [spots[t] for t in tickers], repeat(expiry))
         
-        completed = 0
-        for future in as_completed(futures):
-            completed += 1
-            if progress_callback:
-                progress_callback(completed / len(tickers))
+        for ticker, inputs in zip(tickers, results):
+            if inputs is None:
+                continue
             
-            results = future.result()
-            if results:
-                all_results.extend(results)
+            fractals = _ticker_fractals(ticker, date.today(), _history_slice(hist_all, ticker))
+            if fractals is None:
+                print(f"[SCREENER] {ticker}: Insufficient historical data")
+                continue
+            
+            spot, options_df = inputs
+            payloads.append((ticker, spot, options_df, fractals, ctx))
+    
+    if not payloads:
+        return pd.DataFrame()
+    
+    # 2. CPU: IV/probabilidades/IV Rank. Vetorizado por ticker (microssegundos):
+    # um pool de processos custaria mais em fork/pickle do que o cálculo
+    all_results = [scan_single_ticker(*payload) for payload in payloads]
     
+    all_results = [res for res in all_results if res is not None]
     if not all_results:
         return pd.DataFrame()
     
-    df = pd.DataFrame(all_results)
+    # Concatena coluna a coluna (arrays já tipados, sem inferência linha a linha)
+    df = pd.DataFrame({
+        col: np.concatenate([res[col] for res in all_results])
+        for col in all_results[0]
+    }, copy=False).round(ROUND_SPEC)
     
-    # Ordena por Yield decrescente
-    df = df.sort_values('Yield %', ascending=False)
+    # Ordena por Yield decrescente (argsort estável direto no array)
+    order = np.argsort(-df['Yield %'].to_numpy(), kind='stable')
+    df = df.iloc[order].reset_index(drop=True)
     
     return df
 
 
-def apply_recommendation_style(val):
-    """Aplica cor de fundo baseada na recomendação."""
-    colors = {
-        'VENDA FORTE': 'background-color: rgba(57, 229, 140, 0.3)',
-        'OPORTUNIDADE': 'background-color: rgba(0, 212, 255, 0.3)',
-        'NEUTRO': 'background-color: rgba(99, 110, 250, 0.3)',
-        'CAUTELA': 'background-color: rgba(255, 179, 2, 0.3)',
-        'RISCO ALTO': 'background-color: rgba(255, 75, 75, 0.3)',
-    }
-    return colors.get(val, '')
+@st.cache_data(ttl=600, show_spinner=False)
+def _cached_scan(tickers: tuple, expiry: date) -> pd.DataFrame:
+    """
+    Scan cacheado por (tickers, vencimento): trocar o vencimento dispara um novo scan.
+    Scan vazio levanta ValueError em vez de ser cacheado, sem limpar as demais chaves.
+    """
+    df = run_full_scan(list(tickers), expiry)
+    if df.empty:
+        raise ValueError("Nenhuma opção encontrada com dados válidos.")
+    return df
 
 
-def apply_hurst_style(val):
-    """Aplica cor baseada no Hurst."""
-    try:
-        h = float(val)
-        if h > 0.55:
-            return 'color: #39E58C'  # Verde - persistente
-        elif h < 0.45:
-            return 'color: #FFB302'  # Amarelo - reversão
-        else:
-            return 'color: #636EFA'  # Azul - random
-    except:
-        return ''
+@lru_cache(maxsize=2)
+def _third_fridays_cache(today_iso: str) -> tuple:
+    """Próximas 12 terceiras sextas-feiras a partir do mês seguinte (calculadas uma vez por dia)."""
+    start = (date.fromisoformat(today_iso) + relativedelta(months=1)).replace(day=1)
+    return tuple(d.date() for d in pd.date_range(start, periods=12, freq='WOM-3FRI'))
+
+
+# Cor de fundo por recomendação
+REC_STYLES = {
+    'VENDA FORTE': 'background-color: rgba(57, 229, 140, 0.3)',
+    'OPORTUNIDADE': 'background-color: rgba(0, 212, 255, 0.3)',
+    'NEUTRO': 'background-color: rgba(99, 110, 250, 0.3)',
+    'CAUTELA': 'background-color: rgba(255, 179, 2, 0.3)',
+    'RISCO ALTO': 'background-color: rgba(255, 75, 75, 0.3)',
+}
+
+
+def hurst_style_vec(hurst: pd.Series) -> np.ndarray:
+    """Cor do Hurst para a coluna inteira (np.select sobre os limiares 0.45/0.55)."""
+    h = hurst.to_numpy(dtype=np.float64)
+    return np.select(
+        [h > 0.55, h < 0.45],
+        ['color: #39E58C', 'color: #FFB302'],  # Verde - persistente / Amarelo - reversão
+        default='color: #636EFA'               # Azul - random
+    )
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _style_css(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    CSS das células coloridas (Recomendação e Hurst) para o scan inteiro.
+    Cacheado pelo conteúdo do scan: trocar o filtro de recomendação só
+    seleciona linhas deste frame, sem recalcular estilo célula a célula.
+    """
+    return pd.DataFrame({
+        'Recomendação': df['Recomendação'].map(REC_STYLES).fillna(''),
+        'Hurst': hurst_style_vec(df['Hurst']),
+    }, index=df.index)
 
 
 def render():
@@ -272,10 +409,7 @@ def render():
     with col1:
         # Seleção de vencimento
         current_date = date.today()
-        available_expirations = []
-        for i in range(1, 4):
-            future_date = current_date + relativedelta(months=i)
-            available_expirations.append(get_third_friday(future_date.year, future_date.month))
+        available_expirations = _third_fridays_cache(current_date.isoformat())[:3]
         
         expiry_options = {
             f"{exp.strftime('%d/%m/%Y')} ({(exp - current_date).days} dias)": exp 
@@ -314,29 +448,18 @@ def render():
     st.markdown("---")
     
     # Execução do scan
-    if scan_button or 'screener_df' in st.session_state:
-        if scan_button:
-            st.warning("⏳ Buscando dados do opcoes.net.br... Isso pode levar alguns minutos na primeira execução.")
-            progress_bar = st.progress(0, text="Escaneando ativos...")
-            
-            def update_progress(pct):
-                progress_bar.progress(pct, text=f"Escaneando ativos... {int(pct*100)}%")
-            
-            df = run_full_scan(LIQUID_TICKERS, expiry, update_progress)
-            progress_bar.empty()
-            
-            if df.empty:
-                st.warning("Nenhuma opção encontrada com dados válidos.")
+    if scan_button:
+        st.session_state['screener_scan_ativo'] = True
+    
+    if st.session_state.get('screener_scan_ativo'):
+        with st.spinner("⏳ Buscando dados do opcoes.net.br... Isso pode levar alguns minutos na primeira execução."):
+            try:
+                df = _cached_scan(tuple(LIQUID_TICKERS), expiry)
+            except ValueError as e:
+                # Falhas não entram em nenhum cache: o próximo scan busca de novo
+                print(f"[SCREENER] Scan falhou: {e}")
+                st.warning(str(e))
                 return
-            
-            st.session_state['screener_df'] = df
-            st.session_state['screener_expiry_used'] = expiry
-        
-        df = st.session_state.get('screener_df', pd.DataFrame())
-        
-        if df.empty:
-            st.warning("Nenhum dado disponível. Clique em 'Escanear' para buscar.")
-            return
         
         # Aplica filtro de recomendação
         if rec_filter:
@@ -375,10 +498,9 @@ def render():
         df_display = df_filtered[display_cols].copy()
         
         # Estilização
-        styled_df = df_display.style.applymap(
-            apply_recommendation_style, subset=['Recomendação']
-        ).applymap(
-            apply_hurst_style, subset=['Hurst']
+        css = _style_css(df)
+        styled_df = df_display.style.apply(
+            lambda d: css.loc[d.index, d.columns], axis=None, subset=['Recomendação', 'Hurst']
         ).format({
             'Spot': 'R$ {:.2f}',
             'Strike': 'R$ {:.2f}',
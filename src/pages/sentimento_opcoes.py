@@ -7,9 +7,10 @@ Indicadores de sentimento baseados no mercado de opções.
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
-from datetime import datetime, date
+import time
+from datetime import date
 
 from src.data_loaders.opcoes_net import get_cached_options_data
 from src.data_loaders.pcr import (
@@ -17,25 +18,96 @@ from src.data_loaders.pcr import (
     calcular_max_pain,
     interpretar_pcr,
     carregar_pcr_historico,
-    calcular_pcr_percentil
+    calcular_pcr_percentil,
+    ordenar_historico_pcr,
+    codigos_tipo,
+    TIPO_DTYPE
 )
 from src.models.put_utils import get_asset_price_yesterday
 
 
+@st.cache_data(ttl=900, show_spinner=False)
+def _load_options(ticker: str, atualizacao: int = 0) -> pd.DataFrame:
+    """
+    Cadeia de opções em cache por 15 min, compartilhado entre todos os usuários
+    do processo: os dois botões reaproveitam a mesma busca.
+    `atualizacao` entra na chave do cache: um token novo força nova busca só
+    deste ticker, sem limpar as entradas dos demais usuários.
+    O tipo vira categórico e o OI é reduzido ao menor inteiro sem sinal uma vez
+    aqui (PCR, Max Pain e histograma leem só arrays compactos).
+    """
+    options_df = get_cached_options_data(ticker, force_refresh=atualizacao > 0)
+    if options_df.empty:
+        return options_df
+    return options_df.assign(
+        type=options_df['type'].astype(TIPO_DTYPE),
+        open_interest=pd.to_numeric(options_df['open_interest'], errors='coerce', downcast='unsigned')
+    )
+
+
+def _token_atualizacao(ticker: str) -> int:
+    """Token de atualização da cadeia deste ticker na sessão (0 = cache normal)."""
+    return st.session_state.get(f'options_atualizacao_{ticker}', 0)
+
+
+def _forcar_atualizacao(ticker: str) -> int:
+    """Gera um token novo para o ticker: a próxima leitura ignora o cache."""
+    token = time.time_ns()
+    st.session_state[f'options_atualizacao_{ticker}'] = token
+    return token
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _load_pcr_historico(ticker: str) -> pd.DataFrame:
+    """Histórico de PCR reaproveitado entre reruns da mesma sessão."""
+    return carregar_pcr_historico(ticker)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _pcr_historico_ordenado(ticker: str):
+    """PCR histórico ordenado uma vez por ticker: o percentil vira uma busca binária."""
+    return ordenar_historico_pcr(_load_pcr_historico(ticker))
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _max_pain_snapshot(options_df: pd.DataFrame, spot_price: float):
+    """
+    Max Pain da cadeia, compartilhado entre sessões: o cache do Streamlit vale
+    para o processo inteiro, então usuários que abrem o mesmo ticker no mesmo
+    intervalo leem o resultado pronto em vez de recalcular.
+    """
+    return calcular_max_pain(options_df, spot_price)
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _pcr_snapshot(options_df: pd.DataFrame) -> dict:
+    """PCR da cadeia, compartilhado entre sessões (ver _max_pain_snapshot)."""
+    return calcular_pcr(options_df)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _spot_yesterday(ticker_sa: str, today: date) -> float:
+    """Fechamento de ontem cacheado por (ticker, dia): a virada do dia invalida a entrada."""
+    return get_asset_price_yesterday(ticker_sa)
+
+
 # ============================================================
 # GRÁFICOS
 # ============================================================
+# Cacheados pelo conteúdo dos argumentos (DataFrame/dict hasheados pelo
+# Streamlit): reruns sem dados novos reaproveitam a figura pronta.
 
+@st.cache_data(ttl=600, show_spinner=False)
 def gerar_grafico_max_pain(pain_por_strike: dict, max_pain_strike: float, spot_price: float):
     """Gera gráfico de barras do Max Pain."""
     if not pain_por_strike:
         return go.Figure().update_layout(title="Sem dados de Max Pain")
     
-    strikes = list(pain_por_strike.keys())
-    valores = [v / 1_000_000 for v in pain_por_strike.values()]  # Converter para milhões
+    strikes = np.fromiter(pain_por_strike.keys(), dtype=np.float64, count=len(pain_por_strike))
+    valores = np.fromiter(pain_por_strike.values(), dtype=np.float64, count=len(pain_por_strike)) / 1_000_000  # Converter para milhões
     
     # Criar cores (destacar max pain)
-    colors = ['#636EFA' if s != max_pain_strike else '#00CC96' for s in strikes]
+    colors = np.where(strikes == max_pain_strike, '#00CC96', '#636EFA')
     
     fig = go.Figure(data=[
         go.Bar(
@@ -70,6 +142,7 @@ def gerar_grafico_max_pain(pain_por_strike: dict, max_pain_strike: float, spot_p
         xaxis_title='Strike (R$)',
         yaxis_title='Valor em Risco (R$ Milhões)',
         template='brokeberg',
+        uirevision='sentimento',
         showlegend=False,
         height=400
     )
@@ -77,6 +150,7 @@ def gerar_grafico_max_pain(pain_por_strike: dict, max_pain_strike: float, spot_p
     return fig
 
 
+@st.cache_data(ttl=600, show_spinner=False)
 def gerar_grafico_pcr_historico(df_historico: pd.DataFrame):
     """Gera gráfico de linha do PCR histórico."""
     if df_historico.empty:
@@ -85,7 +159,7 @@ def gerar_grafico_pcr_historico(df_historico: pd.DataFrame):
     fig = go.Figure()
     
     # Linha do PCR
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df_historico['data'],
         y=df_historico['pcr_oi'],
         mode='lines+markers',
@@ -103,8 +177,9 @@ def gerar_grafico_pcr_historico(df_historico: pd.DataFrame):
     fig.add_hline(y=0.7, line_dash="dot", line_color="green",
                   annotation_text="Otimismo (0.7)", annotation_position="right")
     
-    # Áreas de extremo
-    fig.add_hrect(y0=1.5, y1=df_historico['pcr_oi'].max() * 1.1 if not df_historico['pcr_oi'].isna().all() else 2,
+    # Áreas de extremo (max é NaN só quando a coluna inteira é NaN)
+    pcr_max = df_historico['pcr_oi'].max()
+    fig.add_hrect(y0=1.5, y1=pcr_max * 1.1 if pd.notna(pcr_max) else 2,
                   fillcolor="red", opacity=0.1, line_width=0,
                   annotation_text="Zona de Medo Extremo", annotation_position="top left")
     
@@ -117,6 +192,7 @@ def gerar_grafico_pcr_historico(df_historico: pd.DataFrame):
         xaxis_title='Data',
         yaxis_title='Put-Call Ratio',
         template='brokeberg',
+        uirevision='sentimento',
         height=400,
         hovermode='x unified'
     )
@@ -124,42 +200,45 @@ def gerar_grafico_pcr_historico(df_historico: pd.DataFrame):
     return fig
 
 
+@st.cache_data(ttl=600, show_spinner=False)
 def gerar_grafico_oi_agregado(options_df: pd.DataFrame, spot_price: float = None):
     """Gera gráfico de barras do Open Interest agregado por tipo e bins de strike."""
     if options_df.empty:
         return go.Figure().update_layout(title="Sem dados")
     
-    # Criar cópia e agregar strikes em bins de R$5
-    df = options_df.copy()
+    # Agregar strikes em bins de R$5: um np.bincount por tipo, pesado pelo OI
     bin_size = 5
-    df['strike_bin'] = (df['strike'] // bin_size) * bin_size
-    
-    # Agregar por bin e tipo
-    df_agg = df.groupby(['strike_bin', 'type'])['open_interest'].sum().reset_index()
-    
-    # Pivotar para ter colunas separadas
-    df_pivot = df_agg.pivot(index='strike_bin', columns='type', values='open_interest').fillna(0)
+    strike = options_df['strike'].to_numpy(dtype=np.float64)
+    oi = np.nan_to_num(options_df['open_interest'].to_numpy(dtype=np.float64))
+    codes = codigos_tipo(options_df)
+    
+    valid = ~np.isnan(strike)
+    oi, codes = oi[valid], codes[valid]
+    idx = (strike[valid] // bin_size).astype(np.int64)
+    if idx.size == 0:
+        return go.Figure().update_layout(title="Sem dados")
+    base = idx.min()
+    idx -= base
+    nbins = idx.max() + 1
+    bins = (np.arange(nbins) + base) * bin_size
     
     fig = go.Figure()
     
-    if 'CALL' in df_pivot.columns:
-        fig.add_trace(go.Bar(
-            x=df_pivot.index,
-            y=df_pivot['CALL'],
-            name='CALL OI',
-            marker_color='#00CC96',
-            hovertemplate='Strike: R$ %{x:.0f}-%{customdata:.0f}<br>CALL OI: %{y:,.0f}<extra></extra>',
-            customdata=[x + bin_size for x in df_pivot.index]
-        ))
-    
-    if 'PUT' in df_pivot.columns:
+    # Eixo numérico: CALL ocupa a 1ª metade do bin e PUT a 2ª (sem barmode='group')
+    half = bin_size / 2
+    for code, name, color, offset in [(0, 'CALL OI', '#00CC96', 0.0), (1, 'PUT OI', '#EF553B', half)]:
+        mask = codes == code
+        if not mask.any():
+            continue
         fig.add_trace(go.Bar(
-            x=df_pivot.index,
-            y=df_pivot['PUT'],
-            name='PUT OI',
-            marker_color='#EF553B',
-            hovertemplate='Strike: R$ %{x:.0f}-%{customdata:.0f}<br>PUT OI: %{y:,.0f}<extra></extra>',
-            customdata=[x + bin_size for x in df_pivot.index]
+            x=bins,
+            y=np.bincount(idx[mask], weights=oi[mask], minlength=nbins),
+            name=name,
+            marker_color=color,
+            hovertemplate=f'Strike: R$ %{{x:.0f}}-%{{customdata:.0f}}<br>{name}: %{{y:,.0f}}<extra></extra>',
+            customdata=bins + bin_size,
+            offset=offset,
+            width=half
         ))
     
     # Adicionar linha do spot price
@@ -178,82 +257,32 @@ def gerar_grafico_oi_agregado(options_df: pd.DataFrame, spot_price: float = None
         xaxis_title='Strike (R$)',
         yaxis_title='Open Interest',
         template='brokeberg',
-        barmode='group',
+        uirevision='sentimento',
         height=400,
         legend=dict(orientation='h', yanchor='bottom', y=1.02)
     )
+    fig.update_xaxes(type='linear')
     
     return fig
 
 
 # ============================================================
-# FUNÇÃO PRINCIPAL
+# SEÇÕES (fragments: reruns ficam restritos à seção que mudou)
 # ============================================================
 
-def render():
-    st.header("📊 Sentimento de Opções")
-    
-    st.info(
-        "Análise de sentimento do mercado baseada em **Put-Call Ratio** e **Max Pain**. "
-        "O PCR mede a proporção entre opções de venda e compra; o Max Pain indica onde os vendedores de opções (dealers) perdem menos dinheiro."
-    )
-    
-    # Seleção do ativo
-    ticker = st.selectbox(
-        "Ativo",
-        options=["BOVA11", "PETR4", "VALE3", "ITUB4", "BBDC4"],
-        index=0,
-        key="ticker_sentimento"
-    )
-    
-    # Dois botões separados
-    col_btn1, col_btn2 = st.columns(2)
-    
-    with col_btn1:
-        btn_max_pain = st.button("🎯 Calcular Max Pain", key="btn_max_pain", use_container_width=True)
-    
-    with col_btn2:
-        btn_pcr = st.button("📊 Calcular PCR", key="btn_pcr", use_container_width=True)
-    
-    # Carregar dados para Max Pain
-    if btn_max_pain:
-        with st.spinner(f"Buscando dados de opções de {ticker} para Max Pain..."):
-            options_df = get_cached_options_data(ticker, force_refresh=True)
-            
-            if not options_df.empty:
-                st.session_state['options_max_pain'] = options_df
-                st.session_state['ticker_max_pain'] = ticker
-                st.success(f"✅ {len(options_df)} opções carregadas para Max Pain!")
-            else:
-                st.error("❌ Não foi possível carregar dados de opções.")
-    
-    # Carregar dados para PCR
-    if btn_pcr:
-        with st.spinner(f"Buscando dados de opções de {ticker} para PCR..."):
-            options_df = get_cached_options_data(ticker, force_refresh=True)
-            
-            if not options_df.empty:
-                st.session_state['options_pcr'] = options_df
-                st.session_state['ticker_pcr'] = ticker
-                st.success(f"✅ {len(options_df)} opções carregadas para PCR!")
-            else:
-                st.error("❌ Não foi possível carregar dados de opções.")
-    
-    st.markdown("---")
-    
-    # ================== SEÇÃO MAX PAIN ==================
-    st.markdown("### 🎯 Max Pain")
-    
+@st.fragment
+def _render_max_pain(ticker: str):
+    """Seção Max Pain, a partir da cadeia em st.session_state['options_max_pain']."""
     if 'options_max_pain' in st.session_state and st.session_state.get('ticker_max_pain') == ticker:
         options_df = st.session_state['options_max_pain']
         
         # Obter preço spot
-        spot_price = get_asset_price_yesterday(f"{ticker}.SA")
+        spot_price = _spot_yesterday(f"{ticker}.SA", date.today())
         if spot_price is None:
             spot_price = options_df['strike'].median()
         
         # Calcular Max Pain
-        max_pain_strike, pain_por_strike = calcular_max_pain(options_df, spot_price)
+        max_pain_strike, pain_por_strike = _max_pain_snapshot(options_df, spot_price)
         
         if max_pain_strike and pain_por_strike:
             # Métricas
@@ -282,22 +311,21 @@ def render():
             st.warning("Não foi possível calcular o Max Pain.")
     else:
         st.caption("👆 Clique em 'Calcular Max Pain' para ver a análise.")
-    
-    st.markdown("---")
-    
-    # ================== SEÇÃO PCR ==================
-    st.markdown("### 📊 Put-Call Ratio")
-    
+
+
+@st.fragment
+def _render_pcr(ticker: str):
+    """Seção PCR, a partir da cadeia em st.session_state['options_pcr']."""
     if 'options_pcr' in st.session_state and st.session_state.get('ticker_pcr') == ticker:
         options_df = st.session_state['options_pcr']
         
         # Obter spot price
-        spot_price = get_asset_price_yesterday(f"{ticker}.SA")
+        spot_price = _spot_yesterday(f"{ticker}.SA", date.today())
         if spot_price is None:
             spot_price = options_df['strike'].median()
         
         # Calcular PCR
-        pcr_data = calcular_pcr(options_df)
+        pcr_data = _pcr_snapshot(options_df)
         
         # Métricas principais
         col1, col2, col3, col4 = st.columns(4)
@@ -321,18 +349,24 @@ def render():
         with tab1:
             st.caption("O histórico é construído automaticamente via coleta diária.")
             
-            df_historico = carregar_pcr_historico(ticker)
+            df_historico = _load_pcr_historico(ticker)
             
             if not df_historico.empty:
-                percentil = calcular_pcr_percentil(pcr_data.get('pcr_oi'), df_historico)
+                percentil = calcular_pcr_percentil(
+                    pcr_data.get('pcr_oi'), df_historico,
+                    historico_ordenado=_pcr_historico_ordenado(ticker)
+                )
                 if percentil is not None:
                     st.metric("PCR Percentil", f"{percentil:.0f}%")
                 
-                st.plotly_chart(
-                    gerar_grafico_pcr_historico(df_historico),
-                    use_container_width=True,
-                    key="chart_pcr_historico"
-                )
+                if len(df_historico) >= 2:
+                    st.plotly_chart(
+                        gerar_grafico_pcr_historico(df_historico),
+                        use_container_width=True,
+                        key="chart_pcr_historico"
+                    )
+                else:
+                    st.info("📭 Histórico com apenas 1 dia de coleta. O gráfico aparece a partir do 2º dia.")
             else:
                 st.warning("📭 Ainda não há histórico de PCR. Será construído automaticamente.")
         
@@ -344,6 +378,91 @@ def render():
             )
     else:
         st.caption("👆 Clique em 'Calcular PCR' para ver a análise.")
+
+
+# ============================================================
+# FUNÇÃO PRINCIPAL
+# ============================================================
+
+def render():
+    st.header("📊 Sentimento de Opções")
+    
+    st.info(
+        "Análise de sentimento do mercado baseada em **Put-Call Ratio** e **Max Pain**. "
+        "O PCR mede a proporção entre opções de venda e compra; o Max Pain indica onde os vendedores de opções (dealers) perdem menos dinheiro."
+    )
+    
+    # Seleção do ativo
+    ticker = st.selectbox(
+        "Ativo",
+        options=["BOVA11", "PETR4", "VALE3", "ITUB4", "BBDC4"],
+        index=0,
+        key="ticker_sentimento"
+    )
+    
+    # Dois botões separados + refresh explícito
+    col_btn1, col_btn2, col_btn3 = st.columns([2, 2, 1])
+    
+    with col_btn1:
+        btn_max_pain = st.button("🎯 Calcular Max Pain", key="btn_max_pain", use_container_width=True)
+    
+    with col_btn2:
+        btn_pcr = st.button("📊 Calcular PCR", key="btn_pcr", use_container_width=True)
+    
+    with col_btn3:
+        btn_refresh = st.button("♻️ Forçar refresh", key="btn_refresh_sentimento", use_container_width=True)
+    
+    # Refresh: busca novamente só este ticker e atualiza as seções já carregadas
+    if btn_refresh:
+        with st.spinner(f"Atualizando dados de opções de {ticker}..."):
+            options_df = _load_options(ticker, _forcar_atualizacao(ticker))
+        if not options_df.empty:
+            for secao in ('max_pain', 'pcr'):
+                if st.session_state.get(f'ticker_{secao}') == ticker:
+                    st.session_state[f'options_{secao}'] = options_df
+            st.success(f"✅ {len(options_df)} opções atualizadas!")
+        else:
+            st.error("❌ Não foi possível carregar dados de opções.")
+    
+    # Carregar dados para Max Pain
+    if btn_max_pain:
+        with st.spinner(f"Buscando dados de opções de {ticker} para Max Pain..."):
+            options_df = _load_options(ticker, _token_atualizacao(ticker))
+            
+            if not options_df.empty:
+                st.session_state['options_max_pain'] = options_df
+                st.session_state['ticker_max_pain'] = ticker
+                st.success(f"✅ {len(options_df)} opções carregadas para Max Pain!")
+            else:
+                _forcar_atualizacao(ticker)  # Falha em cache: próxima tentativa busca de novo
+                st.error("❌ Não foi possível carregar dados de opções.")
+    
+    # Carregar dados para PCR
+    if btn_pcr:
+        with st.spinner(f"Buscando dados de opções de {ticker} para PCR..."):
+            options_df = _load_options(ticker, _token_atualizacao(ticker))
+            
+            if not options_df.empty:
+                st.session_state['options_pcr'] = options_df
+                st.session_state['ticker_pcr'] = ticker
+                st.success(f"✅ {len(options_df)} opções carregadas para PCR!")
+            else:
+                _forcar_atualizacao(ticker)  # Falha em cache: próxima tentativa busca de novo
+                st.error("❌ Não foi possível carregar dados de opções.")
+    
+    st.markdown("---")
+    
+    # ================== SEÇÃO MAX PAIN ==================
+    st.markdown("### 🎯 Max Pain")
+    
+    _render_max_pain(ticker)
+    
+    st.markdown("---")
+    
+    # ================== SEÇÃO PCR ==================
+    st.markdown("### 📊 Put-Call Ratio")
+    
+    _render_pcr(ticker)
     
     st.markdown("---")
     
@@ -7,21 +7,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import traceback
-from scipy import stats
-from datetime import date
-from dateutil.relativedelta import relativedelta
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.stats import describe
 import plotly.graph_objects as go
+import yfinance as yf
 
 from src.data_loaders.fred_api import carregar_dados_fred
-from src.data_loaders.b3_api import fetch_option_price_b3
 from src.models.amplitude import analisar_retornos_por_faixa
-from src.models.put_utils import (
-    get_selic_annual, 
-    get_third_friday, 
-    generate_put_ticker, 
-    get_asset_price_yesterday
-)
-from src.models.black_scholes import implied_volatility
+from src.models.math_utils import rolling_minmax, media_desvio_percentil, fracao_nas_caudas, NUMBA_AVAILABLE
 from src.components.charts_amplitude import (
     gerar_grafico_historico_amplitude,
     gerar_histograma_amplitude,
@@ -43,114 +36,68 @@ from src.data_loaders.opcoes_net import (
 # ============================================================
 ATIVOS_ANALISE = ['BOVA11.SA', 'SMAL11.SA']
 PERIODOS_RETORNO = {'1 Mês': 21, '3 Meses': 63, '6 Meses': 126, '1 Ano': 252}
+# Janelas de histórico usadas nos cortes por data
+JANELA_2_ANOS = pd.DateOffset(years=2)
+JANELA_5_ANOS = pd.DateOffset(years=5)
+
+# Layout comum a todos os gráficos da página (montado uma vez só)
+_BASE_LAYOUT = dict(template='brokeberg', title_x=0)
 
 
 
 # ============================================================
-# FUNÇÕES DE CÁLCULO - TERM STRUCTURE
+# TERM STRUCTURE (opcoes.net)
 # ============================================================
-def calcular_term_structure(asset_ticker, asset_price, selic_annual, num_vencimentos=6):
-    """
-    Calcula a estrutura a termo da volatilidade implícita para opções ATM.
-    Retorna DataFrame com: days_to_exp, iv, expiry_date, strike, option_ticker, option_price
-    """
-    current_date = date.today()
-    results = []
-    
-    for i in range(1, num_vencimentos + 1):
-        try:
-            future_date = current_date + relativedelta(months=i)
-            expiry = get_third_friday(future_date.year, future_date.month)
-            days_to_exp = (expiry - current_date).days
-            
-            if days_to_exp <= 0:
-                continue
-            
-            atm_strike = round(asset_price, 0)
-            option_ticker = generate_put_ticker(asset_ticker[:4], expiry, atm_strike)
-            b3_data = fetch_option_price_b3(option_ticker)
-            
-            if b3_data and b3_data['last_price'] > 0:
-                option_price = b3_data['last_price']
-                T = max(days_to_exp / 365.0, 0.001)
-                r = selic_annual / 100
-                
-                try:
-                    iv = implied_volatility(option_price, asset_price, atm_strike, T, r)
-                    
-                    if iv is None or np.isnan(iv) or np.isinf(iv):
-                        continue
-                    
-                    iv_pct = iv * 100
-                    if 5 < iv_pct < 200:
-                        results.append({
-                            'days_to_exp': days_to_exp,
-                            'iv': iv_pct,
-                            'expiry_date': expiry,
-                            'strike': atm_strike,
-                            'option_ticker': option_ticker,
-                            'option_price': option_price
-                        })
-                except Exception:
-                    pass
-        except Exception:
-            continue
-    
-    return pd.DataFrame(results)
+def _figura_vazia(mensagem):
+    """Figura vazia com a mensagem no título (sem dados)."""
+    fig = go.Figure()
+    fig.update_layout(title_text=mensagem, **_BASE_LAYOUT)
+    return fig
 
 
 def gerar_grafico_term_structure(df_term):
     """Gera gráfico de estrutura a termo da IV"""
     if df_term.empty:
-        fig = go.Figure()
-        fig.update_layout(title_text="Sem dados disponíveis para Term Structure", template='brokeberg')
-        return fig
+        return _figura_vazia("Sem dados disponíveis para Term Structure")
     
     fig = go.Figure()
     
-    # Linha principal
+    # Identificar coluna de vencimento
+    col_venc = 'expiry_date' if 'expiry_date' in df_term.columns else 'expiry'
+    venc_txt = pd.to_datetime(df_term[col_venc], errors='coerce').dt.strftime('%d/%m').fillna('')
+    
+    # Linha principal, com os vencimentos como rótulo de texto dos pontos
     fig.add_trace(go.Scatter(
         x=df_term['days_to_exp'],
         y=df_term['iv'],
-        mode='lines+markers',
+        mode='lines+markers+text',
         name='IV ATM',
+        text=venc_txt.tolist(),
+        textposition='top center',
+        textfont=dict(size=10, color='gray'),
         line=dict(color='#00E676', width=2),
         marker=dict(size=10, color='#00E676')
     ))
     
-    # Identificar coluna de vencimento
-    col_venc = 'expiry_date' if 'expiry_date' in df_term.columns else 'expiry'
-
-    # Anotações com vencimentos
-    for _, row in df_term.iterrows():
-        try:
-            venc_txt = row[col_venc].strftime('%d/%m') if pd.notna(row[col_venc]) else ''
-        except:
-            venc_txt = ''
-            
-        fig.add_annotation(
-            x=row['days_to_exp'],
-            y=row['iv'],
-            text=venc_txt,
-            showarrow=False,
-            yshift=15,
-            font=dict(size=10, color='gray')
-        )
-    
     # Linha de tendência
     if len(df_term) >= 2:
-        z = np.polyfit(df_term['days_to_exp'], df_term['iv'], 1)
-        p = np.poly1d(z)
-        x_line = np.linspace(df_term['days_to_exp'].min(), df_term['days_to_exp'].max(), 50)
+        # Mínimos quadrados em forma fechada (poucos pontos; dispensa polyfit/SVD)
+        x = df_term['days_to_exp'].to_numpy(dtype=np.float64)
+        y = df_term['iv'].to_numpy(dtype=np.float64)
+        dx = x - x.mean()
+        sxx = (dx * dx).sum()
+        inclinacao = (dx * (y - y.mean())).sum() / sxx if sxx > 0 else 0.0
+        intercepto = y.mean() - inclinacao * x.mean()
+        x_line = np.linspace(x.min(), x.max(), 50)
         fig.add_trace(go.Scatter(
-            x=x_line, y=p(x_line),
+            x=x_line, y=inclinacao * x_line + intercepto,
             mode='lines', name='Tendência',
             line=dict(color='rgba(255,255,255,0.3)', width=1, dash='dash')
         ))
     
     fig.update_layout(
         title_text='Estrutura a Termo da Volatilidade Implícita',
-        title_x=0, template='brokeberg',
+        **_BASE_LAYOUT,
         xaxis_title="Dias até Vencimento",
         yaxis_title="Volatilidade Implícita (%)",
         showlegend=False, height=400
@@ -159,140 +106,182 @@ def gerar_grafico_term_structure(df_term):
 
 
 # ============================================================
-# FUNÇÕES DE CÁLCULO - VOLATILITY SKEW
+# FUNÇÕES DE CÁLCULO - IV RANK E INTERPRETAÇÕES
 # ============================================================
-def calcular_volatility_skew(asset_ticker, asset_price, selic_annual, expiry_date):
+def _posicao_no_intervalo(values, iv_min, iv_max):
     """
-    Calcula a volatilidade implícita para diferentes strikes (Volatility Skew).
-    Retorna DataFrame com: strike, moneyness, iv, option_ticker, option_price
+    (values - min) / (max - min) * 100, com NaN onde a janela é plana
+    (max == min) ou incompleta, sem avisos de divisão por zero.
     """
-    current_date = date.today()
-    days_to_exp = (expiry_date - current_date).days
-    
-    if days_to_exp <= 0:
-        return pd.DataFrame()
-    
-    results = []
-    moneyness_levels = [0.85, 0.90, 0.95, 1.00, 1.05, 1.10]
-    
-    for moneyness in moneyness_levels:
-        try:
-            strike = round(asset_price * moneyness, 0)
-            option_ticker = generate_put_ticker(asset_ticker[:4], expiry_date, strike)
-            b3_data = fetch_option_price_b3(option_ticker)
-            
-            if b3_data and b3_data['last_price'] > 0:
-                option_price = b3_data['last_price']
-                T = max(days_to_exp / 365.0, 0.001)
-                r = selic_annual / 100
-                
-                try:
-                    iv = implied_volatility(option_price, asset_price, strike, T, r)
-                    
-                    if iv is None or np.isnan(iv) or np.isinf(iv):
-                        continue
-                    
-                    iv_pct = iv * 100
-                    if 5 < iv_pct < 200:
-                        results.append({
-                            'strike': strike,
-                            'moneyness': (moneyness - 1) * 100,
-                            'moneyness_pct': moneyness * 100,
-                            'iv': iv_pct,
-                            'option_ticker': option_ticker,
-                            'option_price': option_price
-                        })
-                except Exception:
-                    pass
-        except Exception:
-            continue
-    
-    return pd.DataFrame(results)
-
-
-def gerar_grafico_skew(df_skew, asset_ticker):
-    """Gera gráfico de Volatility Skew (IV vs Moneyness)"""
-    if df_skew.empty:
-        fig = go.Figure()
-        fig.update_layout(title_text="Sem dados disponíveis para Volatility Skew", template='brokeberg')
-        return fig
-    
-    fig = go.Figure()
-    
-    # Linha do Skew
-    fig.add_trace(go.Scatter(
-        x=df_skew['moneyness'], y=df_skew['iv'],
-        mode='lines+markers', name='IV',
-        line=dict(color='#FF6D00', width=3),
-        marker=dict(size=12, color='#FF6D00', symbol='circle')
-    ))
-    
-    # Marca ponto ATM
-    atm_row = df_skew[df_skew['moneyness'].abs() < 1]
-    if not atm_row.empty:
-        fig.add_trace(go.Scatter(
-            x=atm_row['moneyness'], y=atm_row['iv'],
-            mode='markers', name='ATM',
-            marker=dict(size=18, color='#00E676', symbol='star')
-        ))
-    
-    # Linha vertical no ATM
-    fig.add_vline(x=0, line_dash="dash", line_color="rgba(255,255,255,0.3)")
-    
-    # Anotações dos strikes
-    for _, row in df_skew.iterrows():
-        label = "ATM" if abs(row['moneyness']) < 1 else f"K={int(row['strike'])}"
-        fig.add_annotation(
-            x=row['moneyness'], y=row['iv'],
-            text=label, showarrow=False, yshift=20,
-            font=dict(size=9, color='gray')
-        )
-    
-    fig.update_layout(
-        title_text=f'Volatility Skew - {asset_ticker} (PUT)',
-        title_x=0, template='brokeberg',
-        xaxis_title="Moneyness (% vs ATM)",
-        yaxis_title="Volatilidade Implícita (%)",
-        showlegend=False, height=400
-    )
-    return fig
+    amplitude = iv_max - iv_min
+    rank = np.full(values.shape, np.nan)
+    np.divide(values - iv_min, amplitude, out=rank, where=amplitude > 0)
+    return rank * 100
 
 
-# ============================================================
-# FUNÇÕES DE CÁLCULO - IV RANK E INTERPRETAÇÕES
-# ============================================================
+@st.cache_data(ttl=3600, show_spinner=False)
 def calcular_iv_rank(series, periodo=252):
     """Calcula o IV Rank rolling baseado em um período."""
-    iv_min = series.rolling(window=periodo).min()
-    iv_max = series.rolling(window=periodo).max()
-    return ((series - iv_min) / (iv_max - iv_min)) * 100
+    values = series.to_numpy(dtype=np.float64)
+    if len(values) < periodo:
+        return pd.Series(np.nan, index=series.index)
+    
+    if np.isnan(values).any():
+        iv_min = series.rolling(window=periodo).min().to_numpy()
+        iv_max = series.rolling(window=periodo).max().to_numpy()
+        return pd.Series(_posicao_no_intervalo(values, iv_min, iv_max), index=series.index)
+    
+    if NUMBA_AVAILABLE:
+        # Min e max numa única passada O(N) (filas monotônicas em Numba)
+        iv_min, iv_max = rolling_minmax(values, periodo)
+        iv_min, iv_max = iv_min[periodo - 1:], iv_max[periodo - 1:]
+    else:
+        # Sem Numba: janelas como view do mesmo buffer, reduções em C
+        janelas = sliding_window_view(values, periodo)
+        iv_min = janelas.min(axis=1)
+        iv_max = janelas.max(axis=1)
+    
+    rank = np.full(len(values), np.nan)
+    rank[periodo - 1:] = _posicao_no_intervalo(values[periodo - 1:], iv_min, iv_max)
+    return pd.Series(rank, index=series.index)
+
+
+_IVR_BINS = np.array([20, 40, 60, 80])
+_IVR_LABELS = np.array([
+    "🔵 **BAIXO** - Volatilidade muito baixa. Bom momento para **comprar opções** (prêmios baratos).",
+    "🟢 **MODERADAMENTE BAIXO** - Volatilidade abaixo da média. Compra de opções pode ser interessante.",
+    "🟡 **NEUTRO** - Volatilidade em torno da média histórica.",
+    "🟠 **MODERADAMENTE ALTO** - Volatilidade acima da média. Venda de opções pode ser interessante.",
+    "🔴 **ALTO** - Volatilidade elevada. Bom momento para **vender opções** (prêmios altos).",
+], dtype=object)
+
+_REGIME_BINS = np.array([-2, 0, 2])
+_REGIME_LABELS = np.array([
+    "🔵 **CONTANGO FORTE** - Mercado muito calmo. Volatilidade de curto prazo bem abaixo da média.",
+    "🟢 **CONTANGO LEVE** - Mercado em normalidade.",
+    "🟠 **BACKWARDATION** - Mercado em alerta. Volatilidade de curto prazo acima da média.",
+    "⚠️ **BACKWARDATION FORTE** - Mercado em stress. Volatilidade de curto prazo muito elevada.",
+], dtype=object)
+
+_SEM_DADOS_LABEL = "⚪ **SEM DADOS** - Histórico insuficiente para calcular o indicador."
+
+
+def _rotular_faixas(valores, bins, labels, side):
+    """
+    Mapeia valores para os rótulos das faixas. NaN vira "sem dados" antes do
+    lookup, pois o searchsorted jogaria NaN na última faixa.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    idx = np.searchsorted(bins, valores, side=side)
+    rotulos = np.where(np.isnan(valores), _SEM_DADOS_LABEL, labels[idx])
+    return rotulos[()] if rotulos.ndim == 0 else rotulos
 
 
 def interpretar_iv_rank(iv_rank):
-    """Retorna interpretação textual do IV Rank atual."""
-    if iv_rank >= 80:
-        return "🔴 **ALTO** - Volatilidade elevada. Bom momento para **vender opções** (prêmios altos)."
-    elif iv_rank >= 60:
-        return "🟠 **MODERADAMENTE ALTO** - Volatilidade acima da média. Venda de opções pode ser interessante."
-    elif iv_rank >= 40:
-        return "🟡 **NEUTRO** - Volatilidade em torno da média histórica."
-    elif iv_rank >= 20:
-        return "🟢 **MODERADAMENTE BAIXO** - Volatilidade abaixo da média. Compra de opções pode ser interessante."
-    else:
-        return "🔵 **BAIXO** - Volatilidade muito baixa. Bom momento para **comprar opções** (prêmios baratos)."
+    """
+    Retorna interpretação textual do IV Rank (escalar ou array/Series).
+    Faixas fechadas à esquerda: >= 80 ALTO, >= 60, >= 40, >= 20, senão BAIXO.
+    """
+    return _rotular_faixas(iv_rank, _IVR_BINS, _IVR_LABELS, 'right')
 
 
 def interpretar_regime(mm21, mm63):
-    """Retorna interpretação do regime de volatilidade."""
-    spread = mm21 - mm63
-    if spread > 2:
-        return "⚠️ **BACKWARDATION FORTE** - Mercado em stress. Volatilidade de curto prazo muito elevada."
-    elif spread > 0:
-        return "🟠 **BACKWARDATION** - Mercado em alerta. Volatilidade de curto prazo acima da média."
-    elif spread > -2:
-        return "🟢 **CONTANGO LEVE** - Mercado em normalidade."
-    else:
-        return "🔵 **CONTANGO FORTE** - Mercado muito calmo. Volatilidade de curto prazo bem abaixo da média."
+    """
+    Retorna interpretação do regime de volatilidade (escalar ou array/Series).
+    Faixas do spread MM21 - MM63 abertas à esquerda: > 2, > 0, > -2, senão contango forte.
+    """
+    spread = np.asarray(mm21, dtype=np.float64) - np.asarray(mm63, dtype=np.float64)
+    return _rotular_faixas(spread, _REGIME_BINS, _REGIME_LABELS, 'left')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_precos_ewz(start, end):
+    """Série de preços do EWZ (Adj Close, ou Close) para o cálculo da HV."""
+    ewz_data = yf.download('EWZ', start=start, end=end, progress=False)
+    if ewz_data.empty:
+        return pd.Series(dtype=float)
+    
+    if isinstance(ewz_data.columns, pd.MultiIndex):
+        ewz_data.columns = ewz_data.columns.get_level_values(0)
+    
+    if 'Adj Close' in ewz_data.columns:
+        return ewz_data['Adj Close']
+    elif 'Close' in ewz_data.columns:
+        return ewz_data['Close']
+    return ewz_data.iloc[:, 0]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_retornos_ativos(ativos, start, end, periodos):
+    """
+    Baixa o histórico dos ativos (uma única requisição em lote) e calcula o
+    retorno futuro (%) para cada período. Retorna DataFrame com colunas
+    'retorno_{periodo} ({ativo})'.
+    """
+    try:
+        dados = yf.download(list(ativos), start=start, end=end, group_by='ticker',
+                            auto_adjust=False, progress=False, threads=True)
+    except Exception:
+        return pd.DataFrame()
+    if dados.empty:
+        return pd.DataFrame()
+    
+    # Matriz de preços: uma coluna por ativo
+    precos = {}
+    for ativo in ativos:
+        if isinstance(dados.columns, pd.MultiIndex):
+            if ativo not in dados.columns.get_level_values(0):
+                continue
+            dados_ativo = dados[ativo]
+        else:
+            dados_ativo = dados
+        
+        if 'Adj Close' in dados_ativo.columns:
+            precos[ativo.replace('.SA', '')] = dados_ativo['Adj Close']
+        elif 'Close' in dados_ativo.columns:
+            precos[ativo.replace('.SA', '')] = dados_ativo['Close']
+    
+    if not precos:
+        return pd.DataFrame()
+    df_precos = pd.DataFrame(precos).dropna(how='all')
+    
+    # Retorno futuro (%) de todos os ativos por período via fatiamento da
+    # matriz: R[t] = p[t+d] / p[t] - 1 (equivale a pct_change(d).shift(-d)).
+    # Calculado em float64 e guardado em float32 (colunas contíguas, metade
+    # do tráfego de memória no agrupamento por faixa)
+    p = df_precos.to_numpy(dtype=np.float64)
+    retornos = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for nome_periodo, dias in periodos:
+            r = np.full(p.shape, np.nan, dtype=np.float32)
+            if dias < len(p):
+                r[:-dias] = (p[dias:] / p[:-dias] - 1.0) * 100
+            retornos[nome_periodo] = r
+    
+    return pd.DataFrame({
+        f'retorno_{nome_periodo} ({ativo_label})': np.ascontiguousarray(retornos[nome_periodo][:, j])
+        for j, ativo_label in enumerate(df_precos.columns)
+        for nome_periodo, _ in periodos
+    }, index=df_precos.index)
+
+
+def mapear_colunas_por_ativo(colunas):
+    """
+    Agrupa as colunas 'retorno_{periodo} ({ativo})' por ativo, uma única vez:
+    {ativo: {coluna: nome sem o sufixo ' ({ativo})'}}.
+    """
+    mapa = {}
+    for col in colunas:
+        nome, _, ativo = col.rpartition(' (')
+        mapa.setdefault(ativo.rstrip(')'), {})[col] = nome
+    return mapa
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def calcular_retornos_por_faixa(df_analise_base, indicador, passo, min_range, max_range, sufixo=''):
+    """Cruza os retornos com o indicador e agrega por faixa (memoizado entre reruns)."""
+    df_analise = df_analise_base.join(indicador, how='inner').dropna()
+    return analisar_retornos_por_faixa(df_analise, indicador.name, passo, min_range, max_range, sufixo)
 
 
 # ============================================================
@@ -358,15 +347,14 @@ def gerar_grafico_iv_hv_spread(iv_series, hv_series, spread_series):
     Gera gráfico de IV vs HV com área preenchida para o spread.
     """
     if iv_series.empty or hv_series.empty:
-        fig = go.Figure()
-        fig.update_layout(title_text="Sem dados disponíveis", template='brokeberg')
-        return fig
+        return _figura_vazia("Sem dados disponíveis")
     
     # Últimos 2 anos para melhor visualização
-    cutoff = iv_series.index.max() - pd.DateOffset(years=2)
-    iv_plot = iv_series[iv_series.index >= cutoff]
-    hv_plot = hv_series[hv_series.index >= cutoff]
-    spread_plot = spread_series[spread_series.index >= cutoff]
+    # Índices ordenados: o corte vira um slice (searchsorted) em vez de máscara
+    cutoff = iv_series.index.max() - JANELA_2_ANOS
+    iv_plot = iv_series.iloc[iv_series.index.searchsorted(cutoff):]
+    hv_plot = hv_series.iloc[hv_series.index.searchsorted(cutoff):]
+    spread_plot = spread_series.iloc[spread_series.index.searchsorted(cutoff):]
     
     fig = go.Figure()
     
@@ -400,7 +388,7 @@ def gerar_grafico_iv_hv_spread(iv_series, hv_series, spread_series):
     
     fig.update_layout(
         title_text='IV vs HV (Volatility Risk Premium)',
-        title_x=0, template='brokeberg',
+        **_BASE_LAYOUT,
         xaxis_title="Data",
         yaxis=dict(title="Volatilidade (%)", side='left'),
         yaxis2=dict(title="Spread (p.p.)", side='right', overlaying='y', showgrid=False),
@@ -439,7 +427,7 @@ def render_header_explicacao():
     st.markdown("---")
 
 
-def render_metricas_principais(valor_atual, media_hist, iv_rank_atual, percentil, z_score, mm21, vxewz_series):
+def render_metricas_principais(valor_atual, media_hist, iv_rank_atual, percentil, z_score, mm21, min_252, max_252):
     """Renderiza seção de métricas principais"""
     st.subheader("📈 Métricas Principais")
     
@@ -449,14 +437,15 @@ def render_metricas_principais(valor_atual, media_hist, iv_rank_atual, percentil
         st.metric("Média (5A)", f"{media_hist:.2f}")
     with col2:
         delta_pct = ((valor_atual - media_hist) / media_hist) * 100
-        st.metric("IV Rank (252d)", f"{iv_rank_atual:.1f}%", delta=f"{delta_pct:+.1f}% vs média")
+        iv_rank_txt = f"{iv_rank_atual:.1f}%" if pd.notna(iv_rank_atual) else "N/D"
+        st.metric("IV Rank (252d)", iv_rank_txt, delta=f"{delta_pct:+.1f}% vs média")
         st.metric("Percentil", f"{percentil:.1f}%")
     with col3:
         st.metric("Z-Score", f"{z_score:.2f}")
         st.metric("MM21", f"{mm21:.2f}")
     with col4:
-        st.metric("Mín 252d", f"{vxewz_series.rolling(252).min().iloc[-1]:.2f}")
-        st.metric("Máx 252d", f"{vxewz_series.rolling(252).max().iloc[-1]:.2f}")
+        st.metric("Mín 252d", f"{min_252:.2f}")
+        st.metric("Máx 252d", f"{max_252:.2f}")
 
 
 def render_diagnostico(iv_rank_atual, mm21, mm63):
@@ -470,8 +459,13 @@ def render_diagnostico(iv_rank_atual, mm21, mm63):
     st.markdown("---")
 
 
+@st.fragment
 def render_opcoes_net_analysis():
-    """Renderiza análise de IV usando dados do opcoes.net (Term Structure + Skew)"""
+    """
+    Renderiza análise de IV usando dados do opcoes.net (Term Structure + Skew).
+    Fragment: os inputs e o botão desta seção re-executam só ela, sem refazer
+    o resto da página (FRED, heatmaps, gráficos do VXEWZ).
+    """
     st.subheader("📊 Análise de IV - Opcoes.net")
     
     with st.expander("ℹ️ **O que são Term Structure e Volatility Skew?**", expanded=False):
@@ -526,7 +520,6 @@ def render_opcoes_net_analysis():
                 )
             except Exception as e:
                 error_msg = f"Erro: {e}"
-                import traceback
                 st.error(error_msg)
                 st.code(traceback.format_exc())
         
@@ -548,8 +541,9 @@ def render_opcoes_net_analysis():
                 st.metric("Vencimentos", f"{len(df_term)}")
                 
                 if len(df_term) >= 2:
-                    slope = (df_term['iv'].iloc[-1] - df_term['iv'].iloc[0]) / \
-                           (df_term['days_to_exp'].iloc[-1] - df_term['days_to_exp'].iloc[0])
+                    iv_arr = df_term['iv'].to_numpy()
+                    dias_arr = df_term['days_to_exp'].to_numpy()
+                    slope = (iv_arr[-1] - iv_arr[0]) / (dias_arr[-1] - dias_arr[0])
                     if slope > 0.01:
                         st.success("📈 **CONTANGO**")
                     elif slope < -0.01:
@@ -557,8 +551,8 @@ def render_opcoes_net_analysis():
                     else:
                         st.info("➡️ **FLAT**")
                     
-                    st.metric("IV Curto", f"{df_term['iv'].iloc[0]:.1f}%")
-                    st.metric("IV Longo", f"{df_term['iv'].iloc[-1]:.1f}%")
+                    st.metric("IV Curto", f"{iv_arr[0]:.1f}%")
+                    st.metric("IV Longo", f"{iv_arr[-1]:.1f}%")
         else:
             st.warning("Sem dados para Term Structure")
         
@@ -606,9 +600,7 @@ def render_opcoes_net_analysis():
 def gerar_grafico_skew_multi(df_skew, asset_ticker):
     """Gera gráfico de Volatility Skew com suporte a CALLs e PUTs separados."""
     if df_skew.empty:
-        fig = go.Figure()
-        fig.update_layout(title_text="Sem dados disponíveis para Volatility Skew", template='brokeberg')
-        return fig
+        return _figura_vazia("Sem dados disponíveis para Volatility Skew")
     
     fig = go.Figure()
     
@@ -643,7 +635,7 @@ def gerar_grafico_skew_multi(df_skew, asset_ticker):
     
     fig.update_layout(
         title_text=f'Volatility Skew - {asset_ticker}',
-        title_x=0, template='brokeberg',
+        **_BASE_LAYOUT,
         xaxis_title="Moneyness (% vs ATM)",
         yaxis_title="Volatilidade Implícita (%)",
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
@@ -698,31 +690,16 @@ def render_iv_hv_spread(vxewz_series, ewz_prices=None):
         # Nota: Idealmente usaríamos EWZ prices, mas VXEWZ já é uma série de volatilidade
         # Para este caso, calcularemos HV baseada em preços sintéticos
         
-        # Buscar EWZ via yfinance
-        import yfinance as yf
-        from datetime import timedelta
-        
-        start_date = vxewz_series.index.min()
-        end_date = vxewz_series.index.max()
-        
-        ewz_data = yf.download('EWZ', start=start_date.strftime('%Y-%m-%d'), 
-                              end=end_date.strftime('%Y-%m-%d'), progress=False)
+        # Buscar EWZ via yfinance (em cache entre reruns)
+        ewz_prices = carregar_precos_ewz(
+            vxewz_series.index.min().strftime('%Y-%m-%d'),
+            vxewz_series.index.max().strftime('%Y-%m-%d')
+        )
         
-        if ewz_data.empty:
+        if ewz_prices.empty:
             st.warning("Não foi possível carregar dados do EWZ para cálculo de HV.")
             return
         
-        # Extrair série de preços
-        if isinstance(ewz_data.columns, pd.MultiIndex):
-            ewz_data.columns = ewz_data.columns.get_level_values(0)
-        
-        if 'Adj Close' in ewz_data.columns:
-            ewz_prices = ewz_data['Adj Close']
-        elif 'Close' in ewz_data.columns:
-            ewz_prices = ewz_data['Close']
-        else:
-            ewz_prices = ewz_data.iloc[:, 0]
-        
         # Calcular HV para múltiplos períodos
         df_hv = calcular_hv_multiplos_periodos(ewz_prices, periodos=[5, 10, 21, 63])
         
@@ -751,12 +728,12 @@ def render_iv_hv_spread(vxewz_series, ewz_prices=None):
         spread_atual = spread_series.iloc[-1]
         
         # Estatísticas do spread (últimos 2 anos)
-        cutoff_2y = spread_series.index.max() - pd.DateOffset(years=2)
-        spread_recent = spread_series[spread_series.index >= cutoff_2y]
-        spread_medio = spread_recent.mean()
-        spread_std = spread_recent.std()
+        cutoff_2y = spread_series.index.max() - JANELA_2_ANOS
+        spread_recent = spread_series.iloc[spread_series.index.searchsorted(cutoff_2y):]
+        spread_medio, spread_std, percentil = media_desvio_percentil(
+            spread_recent.to_numpy(dtype=np.float64), float(spread_atual)
+        )
         z_score = (spread_atual - spread_medio) / spread_std if spread_std > 0 else 0
-        percentil = stats.percentileofscore(spread_recent.dropna(), spread_atual)
         
         # Exibir métricas
         m1, m2, m3, m4 = st.columns(4)
@@ -799,32 +776,54 @@ def render_iv_hv_spread(vxewz_series, ewz_prices=None):
         
         # Tabela de HV múltiplos períodos
         with st.expander("📋 HV por Período"):
+            # Última linha das quatro HVs lida uma única vez
+            hv_ultimas = df_hv[['HV_5d', 'HV_10d', 'HV_21d', 'HV_63d']].to_numpy()[-1]
             hv_table = pd.DataFrame({
                 'Período': ['5 dias', '10 dias', '21 dias', '63 dias'],
-                'HV (%)': [
-                    f"{df_hv['HV_5d'].iloc[-1]:.1f}%",
-                    f"{df_hv['HV_10d'].iloc[-1]:.1f}%",
-                    f"{df_hv['HV_21d'].iloc[-1]:.1f}%",
-                    f"{df_hv['HV_63d'].iloc[-1]:.1f}%"
-                ],
-                'Spread vs IV': [
-                    f"{iv_atual - df_hv['HV_5d'].iloc[-1]:+.1f} p.p.",
-                    f"{iv_atual - df_hv['HV_10d'].iloc[-1]:+.1f} p.p.",
-                    f"{iv_atual - df_hv['HV_21d'].iloc[-1]:+.1f} p.p.",
-                    f"{iv_atual - df_hv['HV_63d'].iloc[-1]:+.1f} p.p."
-                ]
+                'HV (%)': [f"{hv:.1f}%" for hv in hv_ultimas],
+                'Spread vs IV': [f"{iv_atual - hv:+.1f} p.p." for hv in hv_ultimas]
             })
-            st.dataframe(hv_table, hide_index=True, use_container_width=True, key="hv_table")
+            # Tabelas pequenas e estáticas: st.table evita o grid virtualizado do st.dataframe
+            st.table(hv_table.set_index('Período'))
     
     except Exception as e:
         st.error(f"Erro ao calcular IV/HV Spread: {e}")
-        import traceback
         st.code(traceback.format_exc(), language="python")
     
     st.markdown("---")
 
 
 
+def _downsample_for_plot(series, max_points=500):
+    """
+    Decima a série para no máximo ~max_points pontos antes de plotar (passo
+    fixo ancorado no último ponto, que é sempre mantido). Só para gráficos de
+    linha cujo dado não é recalculado a partir da série plotada.
+    """
+    if len(series) <= max_points:
+        return series
+    step = -(-len(series) // max_points)
+    return series.iloc[np.arange(len(series) - 1, -1, -step)[::-1]]
+
+
+# Gráficos de charts_amplitude cujo resultado depende só dos dados: a figura
+# é guardada como dict (barato de serializar) e o Streamlit re-executa o
+# render a cada interação sem reconstruir o go.Figure.
+_GRAFICOS_EM_CACHE = {
+    'historico': gerar_grafico_historico_amplitude,
+    'iv_rank': gerar_grafico_iv_rank,
+    'bandas': gerar_grafico_iv_bandas,
+    'regime': gerar_grafico_regime_volatilidade,
+    'roc': gerar_grafico_roc_volatilidade,
+}
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _figura_em_cache(nome, *args):
+    """Figura (dict) do gráfico `nome`, refeita apenas quando os argumentos mudam."""
+    return _GRAFICOS_EM_CACHE[nome](*args).to_dict()
+
+
 def render_historico_vxewz(vxewz_series, valor_atual, media_hist, vxewz_recent):
     """Renderiza seção de histórico VXEWZ"""
     st.subheader("📉 Histórico do VXEWZ")
@@ -842,14 +841,14 @@ def render_historico_vxewz(vxewz_series, valor_atual, media_hist, vxewz_recent):
     
     col_graf, col_hist = st.columns([2, 1])
     with col_graf:
-        st.plotly_chart(gerar_grafico_historico_amplitude(vxewz_series, "Histórico VXEWZ", valor_atual, media_hist), use_container_width=True, key="vxewz_history_chart")
+        st.plotly_chart(_figura_em_cache('historico', _downsample_for_plot(vxewz_series), "Histórico VXEWZ", valor_atual, media_hist), use_container_width=True, key="vxewz_history_chart")
     with col_hist:
         st.plotly_chart(gerar_histograma_amplitude(vxewz_recent, "Distribuição", valor_atual, media_hist, nbins=50), use_container_width=True, key="vxewz_dist_chart")
     
     st.markdown("---")
 
 
-def render_iv_rank_historico(iv_rank_series):
+def render_iv_rank_historico(iv_rank_clean):
     """Renderiza seção IV Rank histórico"""
     st.subheader("🎯 IV Rank Histórico")
     
@@ -871,7 +870,7 @@ def render_iv_rank_historico(iv_rank_series):
         | 80-100% | IV muito alta | Vender opções |
         """)
     
-    st.plotly_chart(gerar_grafico_iv_rank(iv_rank_series), use_container_width=True, key="iv_rank_chart")
+    st.plotly_chart(_figura_em_cache('iv_rank', _downsample_for_plot(iv_rank_clean)), use_container_width=True, key="iv_rank_chart")
     st.markdown("---")
 
 
@@ -894,7 +893,7 @@ def render_bandas_bollinger(vxewz_series):
         ⚠️ **Volatilidade é mean-reverting**: Extremos são oportunidades!
         """)
     
-    st.plotly_chart(gerar_grafico_iv_bandas(vxewz_series), use_container_width=True, key="bb_chart")
+    st.plotly_chart(_figura_em_cache('bandas', vxewz_series), use_container_width=True, key="bb_chart")
     st.markdown("---")
 
 
@@ -917,7 +916,7 @@ def render_regime_volatilidade(vxewz_series):
         - **Estado de stress** do mercado
         """)
     
-    st.plotly_chart(gerar_grafico_regime_volatilidade(vxewz_series), use_container_width=True, key="regime_chart")
+    st.plotly_chart(_figura_em_cache('regime', vxewz_series), use_container_width=True, key="regime_chart")
     st.markdown("---")
 
 
@@ -937,11 +936,11 @@ def render_roc_volatilidade(vxewz_series):
         📉 **Queda < -30%**: Volatilidade colapsando → fim de crise
         """)
     
-    st.plotly_chart(gerar_grafico_roc_volatilidade(vxewz_series), use_container_width=True, key="roc_chart")
+    st.plotly_chart(_figura_em_cache('roc', vxewz_series), use_container_width=True, key="roc_chart")
     st.markdown("---")
 
 
-def render_heatmaps_iv_rank(vxewz_series, iv_rank_series, iv_rank_atual, df_analise_base, cutoff_5y):
+def render_heatmaps_iv_rank(vxewz_series, iv_rank_clean, iv_rank_media, iv_rank_atual, df_analise_base, cutoff_5y, colunas_por_ativo):
     """Renderiza seção Heatmaps por IV Rank"""
     st.subheader("🗺️ Análise de Retornos por Faixa de IV Rank")
     
@@ -954,30 +953,30 @@ def render_heatmaps_iv_rank(vxewz_series, iv_rank_series, iv_rank_atual, df_anal
         - Borda branca = faixa atual
         """)
     
-    iv_rank_for_analysis = iv_rank_series.rename('IV_Rank')
-    df_analise_ivr = df_analise_base.join(iv_rank_for_analysis, how='inner').dropna()
-    
     passo = 10
-    resultados_ivr = analisar_retornos_por_faixa(df_analise_ivr, 'IV_Rank', passo, 0, 100, '%')
+    resultados_ivr = calcular_retornos_por_faixa(df_analise_base, iv_rank_clean, passo, 0, 100, '%')
     
-    faixa_atual_val = int(iv_rank_atual // passo) * passo
-    faixa_atual = f'{faixa_atual_val} a {faixa_atual_val + passo}%'
+    # Sem IV Rank atual (histórico < 252d) não há faixa para destacar
+    if pd.notna(iv_rank_atual):
+        faixa_atual_val = int(iv_rank_atual // passo) * passo
+        faixa_atual = f'{faixa_atual_val} a {faixa_atual_val + passo}%'
+    else:
+        faixa_atual = None
     
     col_hist, col_heat = st.columns([1, 2])
     
     with col_hist:
-        st.plotly_chart(gerar_histograma_amplitude(iv_rank_series.dropna(), "Distribuição do IV Rank", iv_rank_atual, iv_rank_series.mean(), nbins=50), use_container_width=True, key="iv_rank_dist_chart")
+        st.plotly_chart(gerar_histograma_amplitude(iv_rank_clean, "Distribuição do IV Rank", iv_rank_atual, iv_rank_media, nbins=50), use_container_width=True, key="iv_rank_dist_chart")
     
     with col_heat:
         for ativo in ATIVOS_ANALISE:
             ativo_clean = ativo.replace('.SA', '')
-            sufixo = f" ({ativo_clean})"
             st.markdown(f"**{ativo}**")
-            cols_ativo = [c for c in resultados_ivr['Retorno Médio'].columns if ativo_clean in c]
+            cols_ativo = colunas_por_ativo.get(ativo_clean)
             
             if cols_ativo:
-                df_ret = resultados_ivr['Retorno Médio'][cols_ativo].rename(columns=lambda x: x.replace(sufixo, ''))
-                df_hit = resultados_ivr['Taxa de Acerto'][cols_ativo].rename(columns=lambda x: x.replace(sufixo, ''))
+                df_ret = resultados_ivr['Retorno Médio'][list(cols_ativo)].rename(columns=cols_ativo)
+                df_hit = resultados_ivr['Taxa de Acerto'][list(cols_ativo)].rename(columns=cols_ativo)
                 
                 c1, c2 = st.columns(2)
                 c1.plotly_chart(gerar_heatmap_amplitude(df_ret, faixa_atual, "Retorno Médio"), use_container_width=True, key=f"heatmap_ret_{ativo_clean}")
@@ -986,7 +985,7 @@ def render_heatmaps_iv_rank(vxewz_series, iv_rank_series, iv_rank_atual, df_anal
     st.markdown("---")
 
 
-def render_heatmaps_nivel_absoluto(vxewz_series, vxewz_recent, valor_atual, df_analise_base):
+def render_heatmaps_nivel_absoluto(vxewz_series, vxewz_recent, valor_atual, df_analise_base, colunas_por_ativo):
     """Renderiza seção Heatmaps por nível absoluto"""
     st.subheader("🗺️ Análise de Retornos por Nível de VXEWZ")
     
@@ -998,29 +997,25 @@ def render_heatmaps_nivel_absoluto(vxewz_series, vxewz_recent, valor_atual, df_a
         em diferentes *níveis* de volatilidade.
         """)
     
-    vxewz_for_analysis = vxewz_series.rename('VXEWZ')
-    df_analise_vx = df_analise_base.join(vxewz_for_analysis, how='inner').dropna()
-    
     passo_vx = 5
     min_vx = int(np.floor(vxewz_recent.min() / passo_vx)) * passo_vx
     max_vx = int(np.ceil(vxewz_recent.max() / passo_vx)) * passo_vx
     if max_vx == min_vx:
         max_vx += passo_vx
     
-    resultados_vx = analisar_retornos_por_faixa(df_analise_vx, 'VXEWZ', passo_vx, min_vx, max_vx, '')
+    resultados_vx = calcular_retornos_por_faixa(df_analise_base, vxewz_series.rename('VXEWZ'), passo_vx, min_vx, max_vx, '')
     
     faixa_atual_vx_val = int(valor_atual // passo_vx) * passo_vx
     faixa_atual_vx = f'{faixa_atual_vx_val} a {faixa_atual_vx_val + passo_vx}'
     
     for ativo in ATIVOS_ANALISE:
         ativo_clean = ativo.replace('.SA', '')
-        sufixo = f" ({ativo_clean})"
         st.markdown(f"**{ativo}**")
-        cols_ativo = [c for c in resultados_vx['Retorno Médio'].columns if ativo_clean in c]
+        cols_ativo = colunas_por_ativo.get(ativo_clean)
         
         if cols_ativo:
-            df_ret = resultados_vx['Retorno Médio'][cols_ativo].rename(columns=lambda x: x.replace(sufixo, ''))
-            df_hit = resultados_vx['Taxa de Acerto'][cols_ativo].rename(columns=lambda x: x.replace(sufixo, ''))
+            df_ret = resultados_vx['Retorno Médio'][list(cols_ativo)].rename(columns=cols_ativo)
+            df_hit = resultados_vx['Taxa de Acerto'][list(cols_ativo)].rename(columns=cols_ativo)
             
             c1, c2 = st.columns(2)
             c1.plotly_chart(gerar_heatmap_amplitude(df_ret, faixa_atual_vx, "Retorno Médio"), use_container_width=True, key=f"heatmap_vx_ret_{ativo_clean}")
@@ -1029,7 +1024,24 @@ def render_heatmaps_nivel_absoluto(vxewz_series, vxewz_recent, valor_atual, df_a
     st.markdown("---")
 
 
-def render_estatisticas_descritivas(vxewz_recent, iv_rank_series, cutoff_5y):
+_ESTATISTICAS_PANDAS = ['mean', 'median', 'std', 'min', 'max', 'skew', 'kurt']
+
+
+def estatisticas_descritivas(series):
+    """
+    [média, mediana, desvio, mín, máx, assimetria, curtose] da série, com os
+    momentos de uma única chamada a scipy.stats.describe (bias=False: mesmos
+    valores de .std()/.skew()/.kurt() do pandas) mais a mediana.
+    """
+    valores = series.dropna().to_numpy(dtype=np.float64)
+    if valores.size < 4:
+        # Poucos pontos: o pandas já devolve NaN onde o momento não existe
+        return list(series.agg(_ESTATISTICAS_PANDAS).to_numpy())
+    d = describe(valores, bias=False)
+    return [d.mean, np.median(valores), np.sqrt(d.variance), d.minmax[0], d.minmax[1], d.skewness, d.kurtosis]
+
+
+def render_estatisticas_descritivas(vxewz_recent, iv_rank_clean, cutoff_5y):
     """Renderiza seção estatísticas descritivas"""
     with st.expander("📋 Estatísticas Descritivas Completas"):
         col_stat1, col_stat2 = st.columns(2)
@@ -1038,34 +1050,21 @@ def render_estatisticas_descritivas(vxewz_recent, iv_rank_series, cutoff_5y):
             st.markdown("**VXEWZ (5 Anos)**")
             stats_df = pd.DataFrame({
                 'Estatística': ['Média', 'Mediana', 'Desvio Padrão', 'Mínimo', 'Máximo', 'Assimetria', 'Curtose'],
-                'Valor': [
-                    f"{vxewz_recent.mean():.2f}",
-                    f"{vxewz_recent.median():.2f}",
-                    f"{vxewz_recent.std():.2f}",
-                    f"{vxewz_recent.min():.2f}",
-                    f"{vxewz_recent.max():.2f}",
-                    f"{vxewz_recent.skew():.2f}",
-                    f"{vxewz_recent.kurtosis():.2f}"
-                ]
+                'Valor': [f"{v:.2f}" for v in estatisticas_descritivas(vxewz_recent)]
             })
-            st.dataframe(stats_df, hide_index=True, use_container_width=True, key="stats_desc_df")
+            st.table(stats_df.set_index('Estatística'))
         
         with col_stat2:
             st.markdown("**IV Rank (5 Anos)**")
-            iv_rank_recent = iv_rank_series[iv_rank_series.index >= cutoff_5y].dropna()
+            iv_rank_recent = iv_rank_clean.iloc[iv_rank_clean.index.searchsorted(cutoff_5y):]
+            frac_acima_80, frac_abaixo_20 = fracao_nas_caudas(iv_rank_recent.to_numpy(), 80.0, 20.0)
+            valores_ivr = estatisticas_descritivas(iv_rank_recent)[:5]
+            valores_ivr += [frac_acima_80 * 100, frac_abaixo_20 * 100]
             stats_ivr = pd.DataFrame({
                 'Estatística': ['Média', 'Mediana', 'Desvio Padrão', 'Mínimo', 'Máximo', '% Tempo acima 80', '% Tempo abaixo 20'],
-                'Valor': [
-                    f"{iv_rank_recent.mean():.1f}%",
-                    f"{iv_rank_recent.median():.1f}%",
-                    f"{iv_rank_recent.std():.1f}%",
-                    f"{iv_rank_recent.min():.1f}%",
-                    f"{iv_rank_recent.max():.1f}%",
-                    f"{(iv_rank_recent >= 80).mean() * 100:.1f}%",
-                    f"{(iv_rank_recent <= 20).mean() * 100:.1f}%"
-                ]
+                'Valor': [f"{v:.1f}%" for v in valores_ivr]
             })
-            st.dataframe(stats_ivr, hide_index=True, use_container_width=True, key="stats_ivr_df")
+            st.table(stats_ivr.set_index('Estatística'))
 
 
 
@@ -1095,65 +1094,64 @@ def render():
             st.error("Não foi possível carregar os dados do índice VXEWZ.")
             return
         
-        vxewz_series = df_vxewz['VXEWZCLS'].dropna()
+        # float32 basta para um índice de volatilidade cotado com 2 casas e
+        # reduz à metade o tráfego de memória dos rolling/plots seguintes;
+        # dropna só copia de novo se houver buraco (o FRED já vem com ffill)
+        vxewz_series = df_vxewz['VXEWZCLS'].astype(np.float32)
+        if vxewz_series.hasnans:
+            vxewz_series = vxewz_series.dropna()
         if vxewz_series.empty:
             st.error("Série do VXEWZ está vazia.")
             return
         
         # 4. Cálculos Iniciais
-        cutoff_5y = vxewz_series.index.max() - pd.DateOffset(years=5)
-        vxewz_recent = vxewz_series[vxewz_series.index >= cutoff_5y]
-        
-        # Cálculos principais
-        valor_atual = vxewz_series.iloc[-1]
-        media_hist = vxewz_recent.mean()
-        std_hist = vxewz_recent.std()
+        cutoff_5y = vxewz_series.index.max() - JANELA_5_ANOS
+        # Índice ordenado (FRED): slice a partir do corte, sem máscara booleana
+        vxewz_recent = vxewz_series.iloc[vxewz_series.index.searchsorted(cutoff_5y):]
+        
+        # Cálculos principais, sobre o ndarray extraído uma única vez
+        vx_arr = vxewz_series.to_numpy()
+        vx_recent_arr = vxewz_recent.to_numpy()
+        valor_atual = float(vx_arr[-1])
+        # Média, desvio e percentil da janela de 5 anos numa única passada
+        media_hist, std_hist, percentil = media_desvio_percentil(vx_recent_arr, valor_atual)
         z_score = (valor_atual - media_hist) / std_hist
-        percentil = stats.percentileofscore(vxewz_recent, valor_atual)
         iv_rank_series = calcular_iv_rank(vxewz_series, periodo=252)
         iv_rank_atual = iv_rank_series.iloc[-1]
-        mm21 = vxewz_series.rolling(window=21).mean().iloc[-1]
-        mm63 = vxewz_series.rolling(window=63).mean().iloc[-1]
+        # Série sem NaN (já nomeada para o join) e média calculadas uma vez
+        # e compartilhadas entre gráfico, histograma, heatmaps e estatísticas
+        iv_rank_clean = iv_rank_series.dropna().rename('IV_Rank')
+        iv_rank_media = iv_rank_clean.mean()
+        # Só o último valor das médias móveis / extremos interessa: cauda do array
+        n_vx = vx_arr.size
+        mm21 = vx_arr[-21:].mean(dtype=np.float64) if n_vx >= 21 else np.nan
+        mm63 = vx_arr[-63:].mean(dtype=np.float64) if n_vx >= 63 else np.nan
+        min_252 = vx_arr[-252:].min() if n_vx >= 252 else np.nan
+        max_252 = vx_arr[-252:].max() if n_vx >= 252 else np.nan
         
         # Renderizar seções
-        render_metricas_principais(valor_atual, media_hist, iv_rank_atual, percentil, z_score, mm21, vxewz_series)
+        render_metricas_principais(valor_atual, media_hist, iv_rank_atual, percentil, z_score, mm21, min_252, max_252)
         render_diagnostico(iv_rank_atual, mm21, mm63)
         render_opcoes_net_analysis()  # Term Structure + Skew unificados
         render_iv_hv_spread(vxewz_series)  # IV/HV Spread - Volatility Risk Premium
         render_historico_vxewz(vxewz_series, valor_atual, media_hist, vxewz_recent)
-        render_iv_rank_historico(iv_rank_series)
+        render_iv_rank_historico(iv_rank_clean)
         render_bandas_bollinger(vxewz_series)
         render_regime_volatilidade(vxewz_series)
         render_roc_volatilidade(vxewz_series)
         
-        # Preparar dados para heatmaps (historico longo via yfinance)
-        import yfinance as yf
-        df_analise_base = pd.DataFrame(index=vxewz_series.index).sort_index()
+        # Preparar dados para heatmaps (historico longo via yfinance, em cache)
+        retornos = carregar_retornos_ativos(
+            tuple(ATIVOS_ANALISE), vxewz_series.index.min(), vxewz_series.index.max(),
+            tuple(PERIODOS_RETORNO.items())
+        )
+        df_analise_base = retornos.reindex(vxewz_series.index.sort_values())
         
-        for ativo in ATIVOS_ANALISE:
-            try:
-                # yf já importado no topo
-                dados_ativo = yf.download(ativo, start=vxewz_series.index.min(), end=vxewz_series.index.max(), auto_adjust=False, progress=False)
-                if not dados_ativo.empty:
-                    if isinstance(dados_ativo.columns, pd.MultiIndex):
-                        dados_ativo.columns = dados_ativo.columns.get_level_values(0)
-                    
-                    if 'Adj Close' in dados_ativo.columns:
-                        price_col = dados_ativo['Adj Close']
-                    elif 'Close' in dados_ativo.columns:
-                        price_col = dados_ativo['Close']
-                    else:
-                        continue
-                    
-                    ativo_label = ativo.replace('.SA', '')
-                    for nome_periodo, dias in PERIODOS_RETORNO.items():
-                        df_analise_base[f'retorno_{nome_periodo} ({ativo_label})'] = price_col.pct_change(periods=dias).shift(-dias) * 100
-            except Exception:
-                pass
-        
-        render_heatmaps_iv_rank(vxewz_series, iv_rank_series, iv_rank_atual, df_analise_base, cutoff_5y)
-        render_heatmaps_nivel_absoluto(vxewz_series, vxewz_recent, valor_atual, df_analise_base)
-        render_estatisticas_descritivas(vxewz_recent, iv_rank_series, cutoff_5y)
+        colunas_por_ativo = mapear_colunas_por_ativo(df_analise_base.columns)
+        
+        render_heatmaps_iv_rank(vxewz_series, iv_rank_clean, iv_rank_media, iv_rank_atual, df_analise_base, cutoff_5y, colunas_por_ativo)
+        render_heatmaps_nivel_absoluto(vxewz_series, vxewz_recent, valor_atual, df_analise_base, colunas_por_ativo)
+        render_estatisticas_descritivas(vxewz_recent, iv_rank_clean, cutoff_5y)
     
     except Exception as e:
         st.error(f"❌ Erro inesperado na página Volatilidade IV: {e}")